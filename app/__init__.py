@@ -1,41 +1,93 @@
 import os
-from flask import Flask, render_template, request, session, redirect
+import threading
+import click
+from flask import Flask, current_app, request, redirect
 from flask_cors import CORS
-from flask_migrate import Migrate
-from flask_wtf.csrf import CSRFProtect, generate_csrf
+from flask_wtf.csrf import generate_csrf
 from flask_login import LoginManager
-from .models import db, User
+from .models import db
 from .api.user_routes import user_routes
 from .api.auth_routes import auth_routes
 from .api.photo_routes import photo_routes
-from .seeds import seed_commands
+from .api.upload_routes import upload_routes
+from .api.storage_routes import storage_routes
 from .config import Config
-
-app = Flask(__name__, static_folder='../react-app/build', static_url_path='/')
+from .json_provider import JSONProvider
+# Extension objects are bound under names of their own: binding them as
+# cache, storage or instrumentation would hide the submodules of those names
+from .cache import cache as response_cache, snapshots
+from .storage import storage as file_storage
+from .instrumentation import instrumentation as request_instrumentation
+from .api.login_helpers import load_cached_user
 
 # Setup login manager
-login = LoginManager(app)
+login = LoginManager()
 login.login_view = 'auth.unauthorized'
 
 
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    return load_cached_user(int(id))
+
+
+def create_app(config=Config):
+    """
+    Builds the Flask app. Nothing here opens a connection or starts a
+    thread: database connections, the storage client and the upload
+    and deletion workers are all created on first use, so an app built
+    in gunicorn's master (preload_app) is safe to fork.
+    Extensions keep their state in app.extensions, so apps built
+    side by side (perf budgets builds its own) don't share caches,
+    storage or workers
+    """
+    app = Flask(__name__, static_folder='../react-app/build', static_url_path='/')
+    app.json = JSONProvider(app)
+    app.config.from_object(config)
+
+    login.init_app(app)
+
+    app.register_blueprint(user_routes, url_prefix='/api/users')
+    app.register_blueprint(auth_routes, url_prefix='/api/auth')
+    app.register_blueprint(photo_routes, url_prefix='/api/photos')
+    app.register_blueprint(upload_routes, url_prefix='/api/uploads')
+    app.register_blueprint(storage_routes, url_prefix='/api/storage')
+
+    request_instrumentation.init_app(app)
+    db.init_app(app)
+    response_cache.init_app(app)
+    snapshots.init_app(app)
+    file_storage.init_app(app)
 
+    # Application Security
+    CORS(app)
 
-# Tell flask about our seed commands
-app.cli.add_command(seed_commands)
+    app.before_request(https_redirect)
+    app.after_request(inject_csrf_token)
+    app.add_url_rule('/api/docs', view_func=api_help)
+    app.add_url_rule('/', 'react_root', react_root, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', 'react_root', react_root)
+    app.register_error_handler(404, not_found)
+    app.register_error_handler(413, too_large)
 
-app.config.from_object(Config)
-app.register_blueprint(user_routes, url_prefix='/api/users')
-app.register_blueprint(auth_routes, url_prefix='/api/auth')
-app.register_blueprint(photo_routes, url_prefix='/api/photos')
+    # Migrations, seeds, perf checks and repairs only run from the flask command;
+    # web workers skip importing them (alembic and faker are slow to load)
+    if click.get_current_context(silent=True) is not None:
+        register_commands(app)
 
-db.init_app(app)
-Migrate(app, db)
+    return app
 
-# Application Security
-CORS(app)
+
+def register_commands(app):
+    from flask_migrate import Migrate
+    from .seeds import seed_commands
+    from .perf import perf_commands
+    from .repair import repair_commands
+
+    Migrate(app, db)
+    # Tell flask about our seed commands
+    app.cli.add_command(seed_commands)
+    app.cli.add_command(perf_commands)
+    app.cli.add_command(repair_commands)
 
 
 # Since we are deploying with Docker and Flask,
@@ -43,7 +95,6 @@ CORS(app)
 # Therefore, we need to make sure that in production any
 # request made over http is redirected to https.
 # Well.........
-@app.before_request
 def https_redirect():
     if os.environ.get('FLASK_ENV') == 'production':
         if request.headers.get('X-Forwarded-Proto') == 'http':
@@ -52,7 +103,6 @@ def https_redirect():
             return redirect(url, code=code)
 
 
-@app.after_request
 def inject_csrf_token(response):
     response.set_cookie(
         'csrf_token',
@@ -64,20 +114,17 @@ def inject_csrf_token(response):
     return response
 
 
-@app.route("/api/docs")
 def api_help():
     """
     Returns all API routes and their doc strings
     """
     acceptable_methods = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
     route_list = { rule.rule: [[ method for method in rule.methods if method in acceptable_methods ],
-                    app.view_functions[rule.endpoint].__doc__ ]
-                    for rule in app.url_map.iter_rules() if rule.endpoint != 'static' }
+                    current_app.view_functions[rule.endpoint].__doc__ ]
+                    for rule in current_app.url_map.iter_rules() if rule.endpoint != 'static' }
     return route_list
 
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
 def react_root(path):
     """
     This route will direct to the public directory in our
@@ -85,10 +132,30 @@ def react_root(path):
     or index.html requests
     """
     if path == 'favicon.ico':
-        return app.send_from_directory('public', 'favicon.ico')
-    return app.send_static_file('index.html')
+        return current_app.send_from_directory('public', 'favicon.ico')
+    return current_app.send_static_file('index.html')
 
 
-@app.errorhandler(404)
 def not_found(e):
-    return app.send_static_file('index.html')
+    return current_app.send_static_file('index.html')
+
+
+def too_large(e):
+    return {"errors": {"file": [f"Upload is larger than {current_app.config['MAX_UPLOAD_SIZE'] // (1024 * 1024)} MB."]}}, 413
+
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def __getattr__(name):
+    # `app` is built on first access, so FLASK_APP=app, gunicorn app:app
+    # and `from app import app` keep working while importing a submodule
+    # (app.models, app.storage...) doesn't build an app
+    global _app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _app_lock:
+        if _app is None:
+            _app = create_app()
+        return _app
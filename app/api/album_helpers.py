@@ -0,0 +1,93 @@
+from sqlalchemy import func, select, update
+from app.models import db, Album, Photo, album_photos
+
+
+def set_cover(album, photo):
+    album.cover_photo_id = photo.id if photo else None
+    album.cover_photo_url = photo.aws_url if photo else None
+
+
+def set_album_photos(album, photos, cover_photo_id=None):
+    """
+    Makes photos the album's members and updates its photo_count and
+    cover to match. The cover is cover_photo_id if given, else the
+    current cover if it stays in the album, else the first photo.
+    Returns an error message if cover_photo_id isn't one of photos
+    """
+    by_id = {photo.id: photo for photo in photos}
+    if cover_photo_id is not None and cover_photo_id not in by_id:
+        return "Cover photo must be one of the album's photos."
+    if cover_photo_id is None:
+        cover_photo_id = album.cover_photo_id if album.cover_photo_id in by_id else min(by_id, default=None)
+
+    album.album_photos = photos
+    album.photo_count = len(photos)
+    set_cover(album, by_id.get(cover_photo_id))
+
+
+def remove_from_albums(photo):
+    """
+    Takes photo out of its albums ahead of deleting it: an album it
+    is the last photo of is deleted, the others count one photo fewer
+    (decremented in SQL) and get a new cover if it was theirs
+    """
+    for album in photo.photo_albums:
+        if album.photo_count <= 1:
+            db.session.delete(album)
+            continue
+
+        album.photo_count = Album.photo_count - 1
+        if album.cover_photo_id == photo.id:
+            set_cover(album, Photo.query
+                      .join(album_photos, album_photos.c.photo_id == Photo.id)
+                      .filter(album_photos.c.album_id == album.id, Photo.id != photo.id)
+                      .order_by(Photo.id)
+                      .first())
+
+
+def refresh_cover_url(photo):
+    """
+    Points the albums using photo as their cover at its current file,
+    after the photo's file was replaced
+    """
+    db.session.execute(
+        update(Album)
+        .where(Album.cover_photo_id == photo.id)
+        .values(cover_photo_url=photo.aws_url)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def recount_albums(*criteria):
+    """
+    Recomputes photo_count and the cover of the albums matching
+    criteria (every album if none are given) from their photos, after
+    rows were written behind the ORM's back (bulk loads, SQL fixes).
+    A cover still in its album is kept; otherwise the first photo is
+    """
+    members = album_photos.alias()
+    kept = select(members.c.photo_id) \
+        .where(members.c.album_id == Album.id, members.c.photo_id == Album.cover_photo_id) \
+        .correlate(Album).scalar_subquery()
+    first = select(func.min(members.c.photo_id)) \
+        .where(members.c.album_id == Album.id) \
+        .correlate(Album).scalar_subquery()
+    db.session.execute(
+        update(Album)
+        .where(*criteria)
+        .values(
+            photo_count=select(func.count()).select_from(members)
+                .where(members.c.album_id == Album.id).scalar_subquery(),
+            cover_photo_id=func.coalesce(kept, first)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        update(Album)
+        .where(*criteria)
+        .values(
+            cover_photo_url=select(Photo.aws_url)
+                .where(Photo.id == Album.cover_photo_id).scalar_subquery()
+        )
+        .execution_options(synchronize_session=False)
+    )
@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, session, request
+from sqlalchemy.exc import IntegrityError
 from app.models import User, db
 from app.forms import LoginForm
 from app.forms import SignUpForm
+from app.forms.signup_form import unique_field_errors
 from flask_login import current_user, login_user, logout_user, login_required
 
 auth_routes = Blueprint('auth', __name__)
@@ -22,16 +24,20 @@ def validation_errors_to_error_messages(validation_errors):
 def authenticate():
     """
     Authenticates a user.
+    Returns the slim session user (User.to_dict); their photos and
+    albums come from their profile, /api/users/<id>
     """
     if current_user.is_authenticated:
-        return current_user.to_dict_with_pics()
+        return current_user.to_dict()
     return {'errors': ['Unauthorized']}
 
 
 @auth_routes.route('/login', methods=['POST'])
 def login():
     """
-    Logs a user in
+    Logs a user in. The form looks the user up once and keeps it;
+    a password hashed with an outdated method is rehashed.
+    Returns the slim session user, as authenticate does
     """
     form = LoginForm()
     # Get the csrf_token from the request cookie and put it into the
@@ -39,9 +45,12 @@ def login():
     form['csrf_token'].data = request.cookies['csrf_token']
     if form.validate_on_submit():
         # Add the user to the session, we are logged in!
-        user = User.query.filter(User.email == form.data['email']).first()
+        user = form.user
+        if user.password_needs_rehash():
+            user.password = form.data['password']
+            db.session.commit()
         login_user(user)
-        return user.to_dict_with_pics()
+        return user.to_dict()
     return {'errors': validation_errors_to_error_messages(form.errors)}, 401
 
 
@@ -57,7 +66,9 @@ def logout():
 @auth_routes.route('/signup', methods=['POST'])
 def sign_up():
     """
-    Creates a new user and logs them in
+    Creates a new user and logs them in.
+    A taken email or username is caught by the unique constraints
+    on insert rather than looked up first
     """
     form = SignUpForm()
     form['csrf_token'].data = request.cookies['csrf_token']
@@ -70,7 +81,14 @@ def sign_up():
             last_name=form.data['last_name']
         )
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            errors = unique_field_errors(e)
+            if errors is None:
+                raise
+            return {'errors': validation_errors_to_error_messages(errors)}, 401
         login_user(user)
         return user.to_dict()
     return {'errors': validation_errors_to_error_messages(form.errors)}, 401
@@ -0,0 +1,160 @@
+import os
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Blob
+from app.storage import storage
+from .deletion_helpers import queue_deletions
+
+
+# Storage filename extension for each sniffed content type
+EXTENSIONS = {"image/png": "png", "image/jpeg": "jpg", "image/webp": "webp"}
+
+
+def blob_filename(staged):
+    """
+    Content-addressed storage filename for a staged file
+    (see stage_file): identical bytes always get the same name
+    """
+    return f"{staged['sha256']}.{EXTENSIONS[staged['content_type']]}"
+
+
+def acquire_blob(sha256, pending=False):
+    """
+    Takes a reference to the stored file with these bytes and returns
+    its Blob, or None if there is no such file yet. A blob whose upload
+    is still running only counts with pending, for the uploads that
+    store the bytes themselves.
+    The increment is a single UPDATE, so concurrent callers can't lose one
+    """
+    criteria = [Blob.sha256 == sha256]
+    if not pending:
+        criteria.append(Blob.stored)
+    result = db.session.execute(
+        db.update(Blob)
+        .where(*criteria)
+        .values(ref_count=Blob.ref_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        return None
+    return db.session.query(Blob).populate_existing().filter(Blob.sha256 == sha256).one()
+
+
+def register_blob(staged):
+    """
+    Records a file about to be uploaded, with one reference and not
+    yet stored (see mark_stored).
+    Two uploads of the same new bytes can race to get here;
+    the loser takes a reference to the winner's row instead
+    """
+    try:
+        with db.session.begin_nested():
+            blob = Blob(
+                sha256=staged["sha256"],
+                filename=blob_filename(staged),
+                size=staged["size"],
+                content_type=staged["content_type"],
+                ref_count=1,
+                stored=False
+            )
+            db.session.add(blob)
+    except IntegrityError:
+        blob = acquire_blob(staged["sha256"], pending=True)
+    return blob
+
+
+def track_file(key, size, content_type):
+    """
+    Records a file the browser uploaded straight to storage (see
+    finalize_upload) as a stored blob with one reference, so it is
+    released like any other file. Its bytes were never hashed, so it
+    has no sha256 and no other upload shares it
+    """
+    blob = Blob(
+        sha256=None,
+        filename=key,
+        size=size,
+        content_type=content_type,
+        ref_count=1,
+        stored=True
+    )
+    db.session.add(blob)
+    return blob
+
+
+def mark_stored(blob, renditions=None):
+    """
+    Records that a blob's file is in storage, so new uploads of the
+    same bytes can share it; keeps the renditions it already has
+    """
+    blob.stored = True
+    if renditions and not blob.renditions:
+        blob.renditions = renditions
+
+
+def release_file(value):
+    """
+    Drops one reference to the stored file at value (a storage key, or
+    a legacy URL). Returns the keys to remove from storage (see
+    queue_deletions): the file and its renditions if that was the
+    last reference, else [].
+    Returns None for a file not tracked as a blob (uploaded before
+    deduplication, or by a direct upload finalized before track_file),
+    which the caller owns outright
+    """
+    if not value:
+        return None
+    filename = storage.key(value)
+    result = db.session.execute(
+        db.update(Blob)
+        .where(Blob.filename == filename)
+        .values(ref_count=Blob.ref_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        return None
+
+    blob = db.session.query(Blob).populate_existing().filter(Blob.filename == filename).one()
+    if blob.ref_count > 0:
+        return []
+    stale = [filename] + [rendition["key"] for rendition in blob.renditions or []]
+    db.session.delete(blob)
+    return stale
+
+
+def release_photo_file(photo):
+    """
+    release_file for a photo's file; an untracked photo file is
+    removed outright, with its renditions
+    """
+    stale = release_file(photo.aws_url)
+    if stale is None:
+        stale = [storage.key(photo.aws_url)] + [rendition["key"] for rendition in photo.renditions or []]
+    return stale
+
+
+def store_file(staged):
+    """
+    Stores a staged file now, in the request: takes a reference to an
+    identical stored file if there is one, else uploads it.
+    A new file's blob is committed before its bytes go up, so the
+    deletion drainer can't remove them before they are tracked, and is
+    committed as stored once they are; it is released again if the
+    upload fails. Callers must not have changes pending.
+    Removes the staged copy; returns {"key"} or {"errors"}
+    """
+    try:
+        blob = acquire_blob(staged["sha256"])
+        if blob is None:
+            blob = register_blob(staged)
+            db.session.commit()
+            upload = storage.save_path(staged["path"], blob_filename(staged))
+            if "key" not in upload:
+                queue_deletions(release_file(blob_filename(staged)))
+                db.session.commit()
+                return upload
+            mark_stored(blob)
+            db.session.commit()
+    finally:
+        os.remove(staged["path"])
+
+    return {"key": blob.filename}
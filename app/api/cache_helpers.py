@@ -0,0 +1,161 @@
+from sqlalchemy import union, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models import db, Photo, User, Comment, Reply, Album, album_photos, ResponseVersion
+from app.cache import photo_key, user_key, user_photos_key, ALBUMS_KEY
+
+
+# Which cached responses a write touches. Writes pass these keys to
+# bump_versions before committing; reads take their ETag from the
+# version readers at the bottom, before building anything.
+# photo:<id>        Photo.to_dict - the photo, its author, comments, replies
+#                   and a summary (cover, length) of each album it's in
+# user_photos:<id>  Photo.to_dict for each of the user's photos
+# user:<id>         the user's profile (profile_helpers) - the user and the
+#                   first page of their photos and of their albums
+# albums:all        every Album.to_dict - album, author and pics
+
+
+def photo_keys(photo_ids):
+    """
+    Keys rendering the given photos in full: each photo and
+    its author's photo stream
+    """
+    if not photo_ids:
+        return []
+
+    return [photo_key(id) for id in photo_ids] + stream_keys(photo_ids)
+
+
+def stream_keys(photo_ids):
+    """
+    The photo streams of the given photos' authors: photo_keys less the
+    photos themselves, for writes that bump the photos' versions in
+    their own UPDATE (bump_counts)
+    """
+    if not photo_ids:
+        return []
+
+    return [user_photos_key(id) for id, in db.session.query(Photo.author_id)
+            .filter(Photo.id.in_(photo_ids)).distinct()]
+
+
+def photo_album_ids(photo_id):
+    """
+    Ids of every album containing the photo
+    """
+    return [id for id, in db.session.query(album_photos.c.album_id)
+            .filter(album_photos.c.photo_id == photo_id)]
+
+
+def album_keys(album_ids, members=True):
+    """
+    Keys rendering the given albums: the album list and each album
+    author's profile. With members, also every photo in the albums,
+    since their album summaries carry the cover and length
+    """
+    if not album_ids:
+        return []
+
+    keys = [ALBUMS_KEY]
+    keys += [user_key(id) for id, in db.session.query(Album.author_id)
+             .filter(Album.id.in_(album_ids))]
+    if members:
+        keys += photo_keys([id for id, in db.session.query(album_photos.c.photo_id)
+                            .filter(album_photos.c.album_id.in_(album_ids))])
+    return keys
+
+
+def user_keys(user_id):
+    """
+    Keys embedding the user's details: their profile, the album list
+    if they have albums, and every photo they posted, commented on or replied on
+    """
+    photo_ids = union(
+        db.select(Photo.id).where(Photo.author_id == user_id),
+        db.select(Comment.photo_id).where(Comment.author_id == user_id),
+        db.select(Comment.photo_id)
+            .join(Reply, Reply.parent_id == Comment.id)
+            .where(Reply.author_id == user_id),
+    )
+    keys = [user_key(user_id)]
+    if db.session.query(Album.id).filter(Album.author_id == user_id).first():
+        keys.append(ALBUMS_KEY)
+    keys += photo_keys([id for id, in db.session.execute(photo_ids)])
+    return keys
+
+
+def bump_versions(keys):
+    """
+    Moves every response in keys to a new version, in the current
+    transaction so the new ETags appear exactly when the write commits:
+    photo:<id> and user:<id> bump the row's version column, list keys
+    their ResponseVersion row
+    """
+    keys = set(keys)
+    photo_ids = [int(key.split(":")[1]) for key in keys if key.startswith("photo:")]
+    user_ids = [int(key.split(":")[1]) for key in keys if key.startswith("user:")]
+    list_keys = sorted(key for key in keys if key.startswith("user_photos:") or key == ALBUMS_KEY)
+
+    for model, ids in ((Photo, photo_ids), (User, user_ids)):
+        if ids:
+            db.session.execute(
+                update(model)
+                .where(model.id.in_(ids))
+                .values(version=model.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+
+    if list_keys:
+        # One upsert: a key's first write creates its row
+        insert = pg_insert if db.session.get_bind().dialect.name == "postgresql" else sqlite_insert
+        db.session.execute(
+            insert(ResponseVersion)
+            .values([{"key": key, "version": 1} for key in list_keys])
+            .on_conflict_do_update(
+                index_elements=[ResponseVersion.key],
+                set_={"version": ResponseVersion.version + 1}
+            )
+        )
+
+
+def photo_etag(version, created_at):
+    # created_at tells a photo from a deleted one whose id it reused
+    # (SQLite hands out the highest id again)
+    return f"{version}.{int(created_at.timestamp() * 1000000)}"
+
+
+def photo_version(photo_id):
+    """
+    The ETag of photo:<id>, or None if there is no such photo
+    """
+    row = db.session.query(Photo.version, Photo.created_at) \
+        .filter(Photo.id == photo_id).first()
+    return photo_etag(*row) if row else None
+
+
+def user_version(user_id):
+    """
+    The ETag of user:<id>, or None if there is no such user
+    """
+    version = db.session.query(User.version).filter(User.id == user_id).scalar()
+    return None if version is None else str(version)
+
+
+def user_photos_version(user_id):
+    """
+    The ETag of user_photos:<id>, or None if there is no such user
+    """
+    row = db.session.query(User.id, ResponseVersion.version) \
+        .outerjoin(ResponseVersion, ResponseVersion.key == user_photos_key(user_id)) \
+        .filter(User.id == user_id).first()
+    return f"{row.version or 0}" if row else None
+
+
+def albums_version():
+    """
+    The ETag of albums:all
+    """
+    version = db.session.query(ResponseVersion.version) \
+        .filter(ResponseVersion.key == ALBUMS_KEY).scalar()
+    return f"{version or 0}"
@@ -0,0 +1,45 @@
+from sqlalchemy import func, or_, select, update
+from app.models import db, Photo, Comment, Reply
+
+
+def bump_counts(photo_id, comments=0, replies=0):
+    """
+    Adds to the photo's comment_count and reply_count in SQL
+    (SET x = x + n), so concurrent comments never lose a count, and
+    bumps its version in the same statement (see cache_helpers)
+    """
+    db.session.execute(
+        update(Photo)
+        .where(Photo.id == photo_id)
+        .values(
+            comment_count=Photo.comment_count + comments,
+            reply_count=Photo.reply_count + replies,
+            version=Photo.version + 1
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def recount_photos(*criteria):
+    """
+    Recomputes comment_count and reply_count of the photos matching
+    criteria (every photo if none are given) from their comments and
+    replies, after rows were written behind the routes' back (bulk
+    loads, SQL fixes). Only rows that were off are written, and their
+    version bumped; returns how many were
+    """
+    comments = select(func.count(Comment.id)) \
+        .where(Comment.photo_id == Photo.id) \
+        .correlate(Photo).scalar_subquery()
+    replies = select(func.count(Reply.id)) \
+        .join(Comment, Reply.parent_id == Comment.id) \
+        .where(Comment.photo_id == Photo.id) \
+        .correlate(Photo).scalar_subquery()
+    result = db.session.execute(
+        update(Photo)
+        .where(*criteria)
+        .where(or_(Photo.comment_count != comments, Photo.reply_count != replies))
+        .values(comment_count=comments, reply_count=replies, version=Photo.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
@@ -0,0 +1,126 @@
+import re
+import threading
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import db, Blob, StorageDeletion
+from app.storage import storage
+
+
+# Content-addressed keys start with the sha256 of the file they
+# (or the file they are a rendition of) hold, see blob_filename
+CONTENT_KEY = re.compile(r"^([0-9a-f]{64})[._]")
+
+_drainer_lock = threading.Lock()
+
+
+def queue_deletions(keys):
+    """
+    Queues the storage objects at keys (or legacy URLs) for removal, in the current
+    transaction: they are only removed if it commits.
+    The drainer is woken once it has
+    """
+    if not keys:
+        return
+    db.session.add_all([StorageDeletion(key=storage.key(key)) for key in keys])
+    db.session.info["storage_deletions"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _drain_after_commit(session):
+    if session.info.pop("storage_deletions", False) and has_app_context():
+        drain_soon()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop("storage_deletions", None)
+
+
+def drain_soon():
+    """
+    Wakes the current app's drainer thread in this process,
+    starting it on first use
+    """
+    app = current_app._get_current_object()
+    with _drainer_lock:
+        wakeup = app.extensions.get("storage_deletions")
+        if wakeup is None:
+            wakeup = app.extensions["storage_deletions"] = threading.Event()
+            threading.Thread(
+                target=_drain_forever,
+                args=(app, wakeup),
+                name="storage-deletions",
+                daemon=True
+            ).start()
+    wakeup.set()
+
+
+def _drain_forever(app, wakeup):
+    # Runs until the process exits; also wakes up on its own to retry
+    # failed removals and pick up rows queued by other processes
+    while True:
+        wakeup.wait(timeout=app.config["STORAGE_DELETE_INTERVAL"])
+        wakeup.clear()
+        with app.app_context():
+            try:
+                while drain_outbox() == app.config["STORAGE_DELETE_BATCH"]:
+                    pass
+            except Exception:
+                app.logger.exception("Draining storage deletions failed")
+            finally:
+                db.session.remove()
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+def drain_outbox():
+    """
+    Removes one batch of due objects (up to STORAGE_DELETE_BATCH,
+    at most 1000 per request) and returns how many rows it handled.
+    Rows are claimed with SKIP LOCKED so drainers in other processes
+    take other rows. A key whose content was stored again since it was
+    queued, or that a blob was registered for since (a direct upload
+    finalized as the sweep expired it), is dropped without removing
+    the object.
+    Failed keys are retried with exponential backoff
+    """
+    now = datetime.now()
+    rows = StorageDeletion.query \
+        .filter(StorageDeletion.next_attempt_at <= now) \
+        .order_by(StorageDeletion.id) \
+        .limit(min(current_app.config["STORAGE_DELETE_BATCH"], 1000)) \
+        .with_for_update(skip_locked=True) \
+        .all()
+    if not rows:
+        db.session.commit()
+        return 0
+
+    shas = {match.group(1) for match in (CONTENT_KEY.match(row.key) for row in rows) if match}
+    live = {sha for sha, in db.session.query(Blob.sha256).filter(Blob.sha256.in_(shas))} if shas else set()
+    others = {row.key for row in rows if not CONTENT_KEY.match(row.key)}
+    tracked = {key for key, in db.session.query(Blob.filename).filter(Blob.filename.in_(others))} \
+        if others else set()
+
+    def is_live(key):
+        match = CONTENT_KEY.match(key)
+        return match.group(1) in live if match else key in tracked
+
+    keys = sorted({row.key for row in rows if not is_live(row.key)})
+    failed = storage.delete_many(keys) if keys else {}
+
+    for row in rows:
+        if row.key in failed:
+            row.attempts += 1
+            row.last_error = failed[row.key][:500]
+            row.next_attempt_at = now + _backoff(row.attempts)
+        else:
+            db.session.delete(row)
+    db.session.commit()
+
+    if failed:
+        current_app.logger.warning("%s storage deletions failed, will retry", len(failed))
+    return len(rows)
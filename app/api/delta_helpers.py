@@ -0,0 +1,32 @@
+from flask import request
+from app.models import db, Photo
+from app.api.cache_helpers import photo_etag
+
+
+def wants_delta():
+    """
+    Comment and reply mutations return the whole photo by default;
+    clients opt in to a delta with ?response=delta
+    """
+    return request.args.get("response") == "delta"
+
+
+def photo_delta(photo_id, **changes):
+    """
+    Builds a delta response: the created, changed or deleted
+    comment/reply passed in changes, plus the photo's new version
+    (the ETag GET /api/photos/<id> now returns, see app/cache.py) and
+    counters so the client can patch its store without refetching the
+    photo. All of it is read from the photo's row in one query
+    """
+    photo = db.session.query(Photo.version, Photo.created_at, Photo.comment_count, Photo.reply_count) \
+        .filter(Photo.id == photo_id).one()
+    return {
+        "photo": {
+            "id": photo_id,
+            "version": photo_etag(photo.version, photo.created_at),
+            "num_comments": photo.comment_count,
+            "num_replies": photo.reply_count
+        },
+        **changes
+    }
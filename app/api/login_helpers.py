@@ -0,0 +1,35 @@
+from sqlalchemy.orm import make_transient_to_detached
+from app.models import db, User
+from app.cache import snapshots, user_snapshot_key
+
+
+# User columns kept in a snapshot; the password hash stays in the database
+SNAPSHOT_COLUMNS = [column.key for column in User.__table__.columns if column.key != 'hashed_password']
+
+
+def load_cached_user(user_id):
+    """
+    The user for the login manager's user_loader. Rebuilt from a cached
+    snapshot of its columns without a query when there is one, else
+    loaded and snapshotted. The rebuilt user is attached to the session
+    like a queried one; its password hash loads on first access
+    """
+    key = user_snapshot_key(user_id)
+    snapshot = snapshots.get(key)
+    if snapshot is None:
+        user = User.query.get(user_id)
+        if user is not None:
+            snapshots.set(key, {column: getattr(user, column) for column in SNAPSHOT_COLUMNS})
+        return user
+
+    user = User(**snapshot)
+    # Mark it as loaded from the database, then attach it without a SELECT
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def forget_user(user_id):
+    """
+    Drops the user's snapshot; call after changing any of their columns
+    """
+    snapshots.delete(user_snapshot_key(user_id))
@@ -0,0 +1,99 @@
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import tuple_
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    """
+    Packs the sort key of the last row on a page into an
+    opaque, url-safe string the client hands back as ?cursor=
+    """
+    raw = json.dumps([
+        value.isoformat() if isinstance(value, date) else value
+        for value in values
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def coerce_cursor_value(column, value):
+    """
+    Converts one decoded cursor value to the python type of its
+    column, raising ValueError if it isn't one: a tampered cursor
+    must never reach the query, where it fails as a 500
+    """
+    python_type = column.type.python_type
+    if python_type in (datetime, date):
+        if not isinstance(value, str):
+            raise ValueError("Invalid cursor")
+        return python_type.fromisoformat(value)
+    # JSON has no separate int and bool, and writes whole floats as ints
+    if isinstance(value, bool) and python_type is not bool:
+        raise ValueError("Invalid cursor")
+    if python_type is float and isinstance(value, int):
+        return float(value)
+    if not isinstance(value, python_type):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def decode_cursor(cursor, columns):
+    """
+    Reverses encode_cursor, coercing each value back to the
+    type of the column it was taken from.
+    Raises ValueError if the cursor was tampered with
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Invalid cursor")
+
+    try:
+        return [coerce_cursor_value(column, value) for column, value in zip(columns, values)]
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def get_page_args(args):
+    """
+    Reads ?limit= and ?cursor= off the request args.
+    Limit is clamped to MAX_PAGE_SIZE;
+    raises ValueError on a non-numeric limit
+    """
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("Invalid limit")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return limit, args.get("cursor")
+
+
+def keyset_page(query, columns, limit, cursor=None):
+    """
+    Orders query by columns (newest first) and returns one page of rows
+    strictly after the cursor, plus the cursor for the next page
+    (None on the last page).
+    The filter is a row-value comparison so an index over the same
+    columns answers every page with a range scan, no OFFSET
+    """
+    if cursor:
+        after = decode_cursor(cursor, columns)
+        query = query.filter(tuple_(*columns) < tuple_(*after))
+
+    rows = query.order_by(*[column.desc() for column in columns]).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+
+    return rows, next_cursor
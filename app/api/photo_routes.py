@@ -1,8 +1,23 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
-from app.models import db, Photo, User, Album, Comment, Reply
+from app.models import db, Photo, Album, Comment, Reply
+from app.models.loaders import PHOTO_FULL, ALBUM_FULL, COMMENT_FULL, REPLY_FULL
+from app.serializers import serialize_photos, serialize_photo, serialize_albums
 from app.forms import PhotoForm, EditPhotoForm, CreateAlbumForm, EditAlbumForm, CommentForm
-from app.api.aws_helpers import get_unique_filename, upload_file_to_s3, remove_file_from_s3
+from app.api.aws_helpers import get_unique_filename
+from app.api.blob_helpers import acquire_blob, blob_filename, release_photo_file
+from app.api.album_helpers import set_album_photos, remove_from_albums, refresh_cover_url
+from app.api.counter_helpers import bump_counts
+from app.api.pagination_helpers import get_page_args, keyset_page
+from app.api.cache_helpers import photo_album_ids, photo_keys, stream_keys, album_keys, bump_versions, \
+    photo_version, user_photos_version, albums_version
+from app.api.delta_helpers import wants_delta, photo_delta
+from app.api.deletion_helpers import queue_deletions
+from app.api.search_helpers import search_query
+from app.api.upload_helpers import PENDING, READY, stage_file, discard_staged, submit_upload
+from app.api.stream_helpers import UploadError
+from app.cache import cache, photo_key, user_key, user_photos_key, ALBUMS_KEY
+from app.storage import storage
 
 photo_routes = Blueprint('photos', __name__)
 
@@ -11,13 +26,52 @@ photo_routes = Blueprint('photos', __name__)
 @login_required
 def all_photos():
     """
-    Query for all photos and returns them
+    Query for one page of photos, newest first, and returns them
     in a list of dictionaries WITH authors, comments, and albums;
     This route populates the home feed.
+    Pages are keyed on (created_at, id): pass ?limit= for page size
+    and the returned next_cursor as ?cursor= for the following page
     """
-    photos = Photo.query.all()
+    try:
+        limit, cursor = get_page_args(request.args)
+        page, next_cursor = keyset_page(
+            db.session.query(Photo.id, Photo.created_at),
+            [Photo.created_at, Photo.id], limit, cursor
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    return {
+        "photos": serialize_photos([row.id for row in page]),
+        "next_cursor": next_cursor
+    }
+
+
+
+# Search Photos
+@photo_routes.route('/search')
+@login_required
+def search_photos():
+    """
+    Full-text search over photo captions, descriptions and comments:
+    ?q= is a list of words, all of which must match. Returns one page
+    of matching photos, best match first, in the same shape as /all;
+    pass ?limit= for page size and the returned next_cursor as ?cursor=
+    """
+    search = search_query(request.args.get("q", ""))
+    if search is None:
+        return {"errors": {"q": ["Enter a word to search for."]}}, 400
 
-    return [photo.to_dict() for photo in photos]
+    try:
+        limit, cursor = get_page_args(request.args)
+        page, next_cursor = keyset_page(*search, limit, cursor)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    return {
+        "photos": serialize_photos([row.id for row in page]),
+        "next_cursor": next_cursor
+    }
 
 
 
@@ -28,13 +82,16 @@ def all_user_photos(userId):
     """
     Query for all photos where author_id == userId
     This route populates a user page's photo stream tab
+    Served from the response cache when possible
     """
-    user = User.query.get(userId)
-    if not user:
-        return {'error':'User could not be found'}
+    def build():
+        photo_ids = [id for id, in db.session.query(Photo.id).filter(Photo.author_id == userId)]
+        return serialize_photos(photo_ids)
 
-    photos = Photo.query.filter(Photo.author_id == userId).all()
-    return [photo.to_dict() for photo in photos]
+    response = cache.cached_json(user_photos_key(userId), user_photos_version(userId), build)
+    if response:
+        return response
+    return {'error':'User could not be found'}, 404
 
 
 
@@ -45,20 +102,39 @@ def get_photo_by_id(photoId):
     """
     Query for one photo by it's Id
     Return in a dictionary with comments, albums, author
+    Served from the response cache when possible
     """
-    photo = Photo.query.get(photoId)
-    if photo:
-        return photo.to_dict()
+    response = cache.cached_json(photo_key(photoId), photo_version(photoId),
+                                 lambda: serialize_photo(photoId))
+    if response:
+        return response
     else:
         return {"error": "Requested photo could not be found"}, 404
 
+# Get Photo upload status
+@photo_routes.route('/<int:photoId>/status')
+@login_required
+def photo_status(photoId):
+    """
+    Returns a photo's upload status and URL, for clients polling
+    after posting a photo
+    """
+    row = db.session.query(Photo.id, Photo.status, Photo.aws_url) \
+        .filter(Photo.id == photoId).first()
+    if not row:
+        return {"error": "Requested photo could not be found"}, 404
+    return {"id": row.id, "status": row.status, "url": storage.url(row.aws_url)}
+
 # Post Photo
 @photo_routes.route('/new', methods=['POST'])
 @login_required
 def post_photo():
     """
     Takes form data, validates against FlaskForm
-    If succesful, uploads to AWS and returns new photo.to_dict_no_author()
+    If the same image is already stored, reuses it and returns new
+    photo.to_dict() (201). Otherwise stages the file, queues its upload
+    to storage and returns the photo with status "pending" (202); the status
+    turns "ready" or "failed" once the upload finishes, see photo_status
     If fail, return error dictionary
     """
     form = PhotoForm()
@@ -66,23 +142,35 @@ def post_photo():
     if form.validate_on_submit():
         photo = form.data["photo"]
         photo.filename = get_unique_filename(photo.filename)
-        upload = upload_file_to_s3(photo)
-
-        if "url" not in upload:
-            return upload["errors"]
-
-        photo_url = upload["url"]
+        try:
+            staged = stage_file(photo)
+        except UploadError as e:
+            return {"errors": {"photo": [str(e)]}}, 400
 
         new_photo = Photo(
             author_id = form.data["author_id"],
-            aws_url = photo_url,
             caption = form.data["caption"],
             description = form.data["description"]
         )
 
+        blob = acquire_blob(staged["sha256"])
+        if blob:
+            discard_staged(staged)
+            new_photo.aws_url = blob.filename
+            new_photo.renditions = blob.renditions
+            new_photo.status = READY
+        else:
+            new_photo.aws_url = blob_filename(staged)
+            new_photo.status = PENDING
+
         db.session.add(new_photo)
+        bump_versions([user_key(new_photo.author_id), user_photos_key(new_photo.author_id)])
         db.session.commit()
-        return jsonify(new_photo.to_dict())
+        if not blob:
+            submit_upload(new_photo.id, staged)
+
+        new_photo = Photo.query.options(*PHOTO_FULL).populate_existing().get(new_photo.id)
+        return jsonify(new_photo.to_dict()), 201 if blob else 202
     else:
         return {"errors": form.errors}, 400
 
@@ -93,35 +181,56 @@ def edit_photo(photoId):
     """
     Takes form data, validates against Flask Form
     Queries for photo and updates attributes
-    If there is a photo submitted with edit form,
-    removes current photo from bucket and uploads given photo
+    If there is a photo submitted with edit form and the same image is
+    already stored, switches to it; otherwise stages it and queues its
+    upload (202), and the photo keeps its current file until the new
+    one is up. The replaced file is removed once nothing else uses it.
+    A new file for a photo whose first upload is still running is
+    refused (409): that upload would overwrite it
     """
     form = EditPhotoForm()
     form['csrf_token'].data = request.cookies['csrf_token']
     if form.validate_on_submit():
         target_photo = Photo.query.get(photoId)
+        old_url = target_photo.aws_url
+        staged = None
 
         if form.data["photo"] is not None:
+            if target_photo.status == PENDING:
+                return {"errors": {"photo": ["This photo is still uploading; try again once it is up."]}}, 409
             photo = form.data["photo"]
             photo.filename = get_unique_filename(photo.filename)
-            upload = upload_file_to_s3(photo)
-
-            if "url" not in upload:
-                return upload["errors"]
-
-            new_photo_url = upload["url"]
-
-            #Upload succeeded, we can remove old photo
-            remove_file_from_s3(target_photo.aws_url)
-
-            target_photo.aws_url = new_photo_url
+            try:
+                staged = stage_file(photo)
+            except UploadError as e:
+                return {"errors": {"photo": [str(e)]}}, 400
+
+            blob = acquire_blob(staged["sha256"])
+            if blob:
+                discard_staged(staged)
+                staged = None
+                # A failed photo holds no file; its aws_url names one that never got stored
+                if target_photo.status == READY:
+                    queue_deletions(release_photo_file(target_photo))
+                target_photo.aws_url = blob.filename
+                target_photo.renditions = blob.renditions
+                target_photo.status = READY
+                refresh_cover_url(target_photo)
 
         target_photo.caption = form.data["caption"]
         target_photo.description = form.data["description"]
 
+        bump_versions([
+            *photo_keys([photoId]),
+            user_key(target_photo.author_id),
+            *album_keys(photo_album_ids(photoId), members=target_photo.aws_url != old_url)
+        ])
         db.session.commit()
+        if staged:
+            submit_upload(photoId, staged, replacing=True)
 
-        return jsonify(target_photo.to_dict())
+        target_photo = Photo.query.options(*PHOTO_FULL).populate_existing().get(photoId)
+        return jsonify(target_photo.to_dict()), 202 if staged else 200
     else:
         return {"errors": form.errors}, 400
 
@@ -133,24 +242,27 @@ def delete_photo(photoId):
     """
     Queries for photo by id and deletes it;
     If last photo in an album, deletes it;
-    Removes file from bucket
+    Removes file from bucket once no photo or user uses it
     """
     target = Photo.query.get(photoId)
     if not target:
         return {"error":"Photo could not be found"}, 404
 
 
-    # Check each album if target is last photo
-    albums = target.photo_albums
-    for album in albums:
-        if len(album.album_photos) == 1:
-            db.session.delete(album)
+    stale_keys = photo_keys([photoId]) + [user_key(target.author_id)]
+    stale_keys += album_keys(photo_album_ids(photoId))
+
+    # Albums it is the last photo of go too; the rest are recounted
+    remove_from_albums(target)
 
-    #delete the target from db and bucket
-    aws_url = target.aws_url
+    #delete the target from db, and queue its file's removal from the bucket
+    #unless another photo or user uses it. A pending or failed photo holds
+    #no file yet; the upload worker cleans up after a deleted photo
+    if target.status == READY:
+        queue_deletions(release_photo_file(target))
     db.session.delete(target)
-    remove_file_from_s3(aws_url)
 
+    bump_versions(stale_keys)
     db.session.commit()
 
     return {
@@ -166,6 +278,7 @@ def create_album():
     queries for all photo id's from form field,
     sets album.album_photos to list of photos
     If cover photo not chosen, defaults to first
+    Photo count and cover are stored on the album
     """
     form = CreateAlbumForm()
     form['csrf_token'].data = request.cookies['csrf_token']
@@ -178,10 +291,17 @@ def create_album():
             new_album.description = form.data["description"]
 
         photoIdList = [int(id) for id in form.data["photos"].split(',')]
-        new_album.album_photos = Photo.query.filter(Photo.id.in_(photoIdList)).all()
-        new_album.cover_photo_url = new_album.album_photos[0].aws_url
+        error = set_album_photos(
+            new_album,
+            Photo.query.filter(Photo.id.in_(photoIdList)).all(),
+            form.data["cover_photo"]
+        )
+        if error:
+            return {"cover_photo": [error]}, 400
 
         db.session.add(new_album)
+        db.session.flush()
+        bump_versions(album_keys([new_album.id]))
         db.session.commit()
 
         return {"newAlbumId": new_album.id}
@@ -192,8 +312,11 @@ def create_album():
 @photo_routes.route('/albums/all')
 @login_required
 def get_all_albums():
-    albums = Album.query.all()
-    return [album.to_dict() for album in albums]
+    """
+    Returns every album WITH author and pics;
+    Served from the response cache when possible
+    """
+    return cache.cached_json(ALBUMS_KEY, albums_version(), serialize_albums)
 
 @photo_routes.route('/albums/<int:albumId>/edit', methods=['PUT'])
 @login_required
@@ -201,20 +324,32 @@ def edit_album(albumId):
     """
     Instantiates EditAlbum flask form
     Queries for album by id
-    Updates title, description, and/or photos
+    Updates title, description, and/or photos;
+    the cover is the chosen cover photo, else the current one
+    if it stays in the album, else the first
     """
     form = EditAlbumForm()
     form['csrf_token'].data = request.cookies['csrf_token']
     if form.validate_on_submit():
         album = Album.query.get(albumId)
+        stale_keys = album_keys([albumId])
         album.title = form.data["title"]
         if form.data["description"]:
             album.description = form.data["description"]
 
         photoIdList = form.data["photos"].split(',')
-        album.album_photos = Photo.query.filter(Photo.id.in_(photoIdList)).all()
+        error = set_album_photos(
+            album,
+            Photo.query.filter(Photo.id.in_(photoIdList)).all(),
+            form.data["cover_photo"]
+        )
+        if error:
+            return {"cover_photo": [error]}, 400
 
+        bump_versions(stale_keys + album_keys([albumId]))
         db.session.commit()
+
+        album = Album.query.options(*ALBUM_FULL).populate_existing().get(albumId)
         return jsonify(album.to_dict())
     else:
         return form.errors, 400
@@ -227,7 +362,9 @@ def delete_album(albumId):
     Deletes it - Photos are not deleted
     """
     target = Album.query.get(albumId)
+    stale_keys = album_keys([albumId])
     db.session.delete(target)
+    bump_versions(stale_keys)
     db.session.commit()
 
     return {
@@ -243,7 +380,8 @@ def create_comment(photoId):
     Queries for photo by Id
     constructs comment with form data after validation
     Then adds to photo with
-    Returns photo.to_dict() for reducer to update
+    Returns photo.to_dict() for reducer to update,
+    or with ?response=delta just the new comment
     """
     form = CommentForm()
     form['csrf_token'].data = request.cookies['csrf_token']
@@ -252,11 +390,21 @@ def create_comment(photoId):
         new_comment = Comment(
             author = current_user,
             photo = target_photo,
-            content = form.data["content"]
+            content = form.data["content"],
+            replies = []
         )
         db.session.add(new_comment)
+        bump_counts(photoId, comments=1)
+        bump_versions([user_photos_key(target_photo.author_id)])
+        # Everything the delta shows is in hand once the comment has an id
+        db.session.flush()
+        comment = new_comment.to_dict_no_photo() if wants_delta() else None
         db.session.commit()
 
+        if comment:
+            return photo_delta(photoId, comment=comment)
+
+        target_photo = Photo.query.options(*PHOTO_FULL).populate_existing().get(photoId)
         return target_photo.to_dict()
     else:
         return form.errors
@@ -267,16 +415,22 @@ def update_comment(commentId):
     """
     Queries for comment by id
     sets comment.content = content from formdata
-    Queries for updated photo and return to_dict()
+    Queries for updated photo and return to_dict(),
+    or with ?response=delta just the updated comment
     """
     form = CommentForm()
     form['csrf_token'].data = request.cookies['csrf_token']
     if form.validate_on_submit():
         comment = Comment.query.get(commentId)
         comment.content = form.data["content"]
+        bump_versions(photo_keys([comment.photo_id]))
         db.session.commit()
 
-        photo = Photo.query.get(comment.photo_id)
+        if wants_delta():
+            comment = Comment.query.options(*COMMENT_FULL).populate_existing().get(commentId)
+            return photo_delta(comment.photo_id, comment=comment.to_dict_no_photo())
+
+        photo = Photo.query.options(*PHOTO_FULL).populate_existing().get(comment.photo_id)
         return photo.to_dict()
     else:
         return form.errors, 400
@@ -291,13 +445,21 @@ def delete_comment(photoId, commentId):
     Queries for photo by id
     and list comprehends photo.comments
     to remove comment by id
-    returns photo.to_dict() for reducer to update
+    returns photo.to_dict() for reducer to update,
+    or with ?response=delta just the deleted comment's id
     """
     target_comment = Comment.query.get(commentId)
+    stale_keys = stream_keys([target_comment.photo_id])
+    # Its replies go with it
+    bump_counts(target_comment.photo_id, comments=-1, replies=-len(target_comment.replies))
     db.session.delete(target_comment)
+    bump_versions(stale_keys)
     db.session.commit()
 
-    target_photo = Photo.query.get(photoId)
+    if wants_delta():
+        return photo_delta(target_comment.photo_id, deleted={"comment": commentId})
+
+    target_photo = Photo.query.options(*PHOTO_FULL).populate_existing().get(photoId)
     return target_photo.to_dict()
 
 
@@ -310,7 +472,8 @@ def reply_to_comment(commentId):
     Queries for parent comment by id,
     creates new reply using comment as parent
     and current user as author.
-    Queries for photo and returns it to update store
+    Queries for photo and returns it to update store,
+    or with ?response=delta just the new reply
     """
     form = CommentForm()
     form['csrf_token'].data = request.cookies['csrf_token']
@@ -322,9 +485,16 @@ def reply_to_comment(commentId):
                     content = form.data["content"]
                     )
         db.session.add(new_reply)
+        bump_counts(parent_comment.photo_id, replies=1)
+        bump_versions(stream_keys([parent_comment.photo_id]))
         db.session.commit()
 
-        photo = Photo.query.get(parent_comment.photo.id)
+        if wants_delta():
+            reply = Reply.query.options(*REPLY_FULL).get(new_reply.id)
+            return photo_delta(parent_comment.photo_id,
+                               reply={**reply.to_dict(), "parent_id": commentId})
+
+        photo = Photo.query.options(*PHOTO_FULL).populate_existing().get(parent_comment.photo_id)
         return photo.to_dict()
     else:
         return form.errors, 400
@@ -337,16 +507,23 @@ def edit_reply(replyId):
     """
     Takes form data containing new content
     Queries for reply by id and overwrites content with form data
-    Queries for photo and returns in a dictionary with updated comments/replies
+    Queries for photo and returns in a dictionary with updated comments/replies,
+    or with ?response=delta just the updated reply
     """
     form = CommentForm()
     form['csrf_token'].data = request.cookies['csrf_token']
     if form.validate_on_submit():
         target_reply = Reply.query.get(replyId)
         target_reply.content = form.data["content"]
+        bump_versions(photo_keys([target_reply.parent.photo_id]))
         db.session.commit()
 
-        photo = Photo.query.get(target_reply.parent.photo.id)
+        if wants_delta():
+            reply = Reply.query.options(*REPLY_FULL).populate_existing().get(replyId)
+            return photo_delta(target_reply.parent.photo_id,
+                               reply={**reply.to_dict(), "parent_id": reply.parent_id})
+
+        photo = Photo.query.options(*PHOTO_FULL).populate_existing().get(target_reply.parent.photo_id)
         return photo.to_dict()
     else:
         return form.errors, 400
@@ -358,14 +535,21 @@ def delete_reply(replyId):
     """
     Queries for reply by id and deletes it.
     Queries for parent photo and returns in a dictionary
-    to update store
+    to update store,
+    or with ?response=delta just the deleted reply's id
     """
     target = Reply.query.get(replyId)
-    photoId = target.parent.photo.id
+    photoId = target.parent.photo_id
+    parentId = target.parent_id
 
     db.session.delete(target)
+    bump_counts(photoId, replies=-1)
+    bump_versions(stream_keys([photoId]))
     db.session.commit()
 
-    photo = Photo.query.get(photoId)
+    if wants_delta():
+        return photo_delta(photoId, deleted={"reply": replyId, "parent_id": parentId})
+
+    photo = Photo.query.options(*PHOTO_FULL).populate_existing().get(photoId)
 
     return photo.to_dict()
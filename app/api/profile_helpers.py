@@ -0,0 +1,57 @@
+from sqlalchemy import func
+from app.models import db, Photo, Album
+from app.serializers import serialize_albums, PHOTO_NO_AUTHOR
+from app.api.pagination_helpers import keyset_page, DEFAULT_PAGE_SIZE
+
+
+def user_photos_page(user_id, limit, cursor=None):
+    """
+    One page of the user's photos (Photo.to_dict_no_author), newest
+    first, and the cursor for the next page. Pages are keyed on
+    (created_at, id), which ix_photos_author_id_created_at_id answers
+    """
+    page, next_cursor = keyset_page(
+        db.session.query(*PHOTO_NO_AUTHOR.columns).filter(Photo.author_id == user_id),
+        [Photo.created_at, Photo.id], limit, cursor
+    )
+    return [PHOTO_NO_AUTHOR.build(row) for row in page], next_cursor
+
+
+def user_albums_page(user_id, limit, cursor=None):
+    """
+    One page of the user's albums (Album.to_dict), newest first,
+    and the cursor for the next page
+    """
+    page, next_cursor = keyset_page(
+        db.session.query(Album.id).filter(Album.author_id == user_id),
+        [Album.id], limit, cursor
+    )
+    albums = {album['id']: album for album in serialize_albums(Album.id.in_([row.id for row in page]))} \
+        if page else {}
+    return [albums[row.id] for row in page if row.id in albums], next_cursor
+
+
+def user_profile(user, limit=DEFAULT_PAGE_SIZE):
+    """
+    User.to_dict plus how many photos and albums the user has and the
+    first page of each; the rest come from /api/users/<id>/photos and
+    /api/users/<id>/albums with the returned cursors. Counts are only
+    queried when there is more than one page
+    """
+    photos, photos_next_cursor = user_photos_page(user.id, limit)
+    albums, albums_next_cursor = user_albums_page(user.id, limit)
+
+    num_photos = len(photos) if photos_next_cursor is None else \
+        db.session.query(func.count(Photo.id)).filter(Photo.author_id == user.id).scalar()
+    num_albums = len(albums) if albums_next_cursor is None else \
+        db.session.query(func.count(Album.id)).filter(Album.author_id == user.id).scalar()
+
+    return {
+        **user.to_dict(),
+        'num_photos': num_photos,
+        'num_albums': num_albums,
+        'photos': photos,
+        'photos_next_cursor': photos_next_cursor,
+        'albums': albums,
+        'albums_next_cursor': albums_next_cursor
+    }
@@ -0,0 +1,83 @@
+import importlib.util
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+
+
+# Renditions are skipped without Pillow. It is only imported in the
+# pool processes that resize, not by every web worker
+HAS_PILLOW = importlib.util.find_spec("PIL") is not None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    The rendition process pool, created on first use in each server
+    process. Resizing is CPU bound, so it runs outside the GIL.
+    Workers come from a fork server (spawned where there is none),
+    never forked from a server process holding threads, locks and
+    database connections
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(
+                max_workers=current_app.config["RENDITION_PROCESSES"],
+                mp_context=multiprocessing.get_context(method)
+            )
+        return _pool
+
+
+def render(path, widths, quality):
+    """
+    Runs in a pool process: writes a WebP copy of the image at path
+    for each width narrower than the original, next to it.
+    Returns [(width, rendition path)], smallest first
+    """
+    from PIL import Image, ImageOps
+
+    stem = os.path.splitext(path)[0]
+    renditions = []
+    with Image.open(path) as original:
+        # Phone photos are often stored sideways with an EXIF rotation
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        for width in sorted(widths):
+            if width >= image.width:
+                break
+            height = round(image.height * width / image.width)
+            out_path = f"{stem}_{width}w.webp"
+            image.resize((width, height), Image.LANCZOS).save(out_path, "WEBP", quality=quality)
+            renditions.append((width, out_path))
+    return renditions
+
+
+def make_renditions(path):
+    """
+    Generates the configured renditions of a staged image in the
+    process pool and waits for them; [] when Pillow is not installed
+    """
+    if not HAS_PILLOW:
+        return []
+    future = get_pool().submit(
+        render,
+        path,
+        current_app.config["RENDITION_WIDTHS"],
+        current_app.config["RENDITION_QUALITY"]
+    )
+    return future.result()
+
+
+def rendition_filename(filename, width):
+    """
+    Storage filename of a rendition of the file stored as filename
+    """
+    return f"{filename.rsplit('.', 1)[0]}_{width}w.webp"
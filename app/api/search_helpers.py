@@ -0,0 +1,142 @@
+import re
+from sqlalchemy import event, func, inspect, literal_column, select, text, Integer, Float
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import table, column
+from app.models import db, Photo, Comment
+
+
+# Text search configuration on Postgres; SQLite's FTS5 table stems
+# with its porter tokenizer to match
+SEARCH_CONFIG = "english"
+
+# Column weights: a caption match ranks above a description match,
+# which ranks above a comment match
+WEIGHTS = {"caption": "A", "description": "B", "comments": "C"}
+FTS_WEIGHTS = (10.0, 4.0, 1.0)
+
+photo_search = table("photo_search", column("rowid", Integer))
+
+
+def _is_postgres(session):
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def index_photos(photo_ids, session=None):
+    """
+    Rebuilds the search documents of photo_ids from their current
+    caption, description and comments, in the current transaction.
+    A photo that no longer exists drops out of the index
+    """
+    session = session or db.session
+    photo_ids = sorted(set(photo_ids))
+    if not photo_ids:
+        return
+
+    if _is_postgres(session):
+        config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+        comments = select(func.string_agg(Comment.content, " ")) \
+            .where(Comment.photo_id == Photo.id) \
+            .scalar_subquery()
+
+        def weighted(value, weight):
+            return func.setweight(func.to_tsvector(config, func.coalesce(value, "")), weight)
+
+        vector = weighted(Photo.caption, WEIGHTS["caption"]) \
+            .op("||")(weighted(Photo.description, WEIGHTS["description"])) \
+            .op("||")(weighted(comments, WEIGHTS["comments"]))
+        session.execute(
+            db.update(Photo)
+            .where(Photo.id.in_(photo_ids))
+            .values(search_vector=vector)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        params = {f"id_{i}": id for i, id in enumerate(photo_ids)}
+        ids = ", ".join(f":{name}" for name in params)
+        session.execute(text(f"DELETE FROM photo_search WHERE rowid IN ({ids})"), params)
+        session.execute(text(f"""
+            INSERT INTO photo_search (rowid, caption, description, comments)
+            SELECT photos.id, photos.caption, photos.description,
+                   (SELECT group_concat(comments.content, ' ')
+                    FROM comments WHERE comments.photo_id = photos.id)
+            FROM photos WHERE photos.id IN ({ids})
+        """), params)
+
+
+def rebuild_index():
+    """
+    Reindexes every photo from scratch, after rows were changed
+    behind the ORM's back (seed undo, bulk SQL)
+    """
+    if not _is_postgres(db.session):
+        db.session.execute(text("DELETE FROM photo_search"))
+    index_photos([id for id, in db.session.query(Photo.id)])
+
+
+def search_query(q):
+    """
+    The photos matching the search terms in q, as a query for (id, rank)
+    rows and the columns to page it by (see keyset_page), best match
+    first; None if q has no terms.
+    Every term has to match, in any of the indexed fields
+    """
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+
+    if _is_postgres(db.session):
+        tsquery = func.websearch_to_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'::regconfig"), " ".join(terms)
+        )
+        id = Photo.id.label("id")
+        rank = func.ts_rank_cd(Photo.search_vector, tsquery, type_=Float).label("rank")
+        query = db.session.query(id, rank) \
+            .filter(Photo.search_vector.op("@@")(tsquery))
+        return query, [rank, id]
+
+    # FTS5 query syntax has operators; quoting each term makes it plain text.
+    # bm25 is lower for better matches, so negate it to sort descending
+    match = " ".join(f'"{term}"' for term in terms)
+    id = photo_search.c.rowid.label("id")
+    rank = (-func.bm25(literal_column("photo_search"), *FTS_WEIGHTS, type_=Float)).label("rank")
+    query = db.session.query(id, rank) \
+        .select_from(photo_search) \
+        .filter(literal_column("photo_search").op("MATCH")(match))
+    return query, [rank, id]
+
+
+# Keep the index current: every flush notes the photos whose caption,
+# description or comments changed, and they are reindexed at commit
+@event.listens_for(Session, "before_flush")
+def _note_changed_photos(session, flush_context, instances):
+    changed = session.info.setdefault("search_photo_ids", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Photo):
+            state = inspect(obj)
+            if obj in session.new or obj in session.deleted \
+                    or state.attrs.caption.history.has_changes() \
+                    or state.attrs.description.history.has_changes():
+                changed.add(obj)
+        elif isinstance(obj, Comment):
+            state = inspect(obj)
+            if obj in session.new or obj in session.deleted \
+                    or state.attrs.content.history.has_changes() \
+                    or state.attrs.photo_id.history.has_changes():
+                # A new comment may only have its photo relationship set
+                changed.add(obj.photo_id if obj.photo_id is not None else obj.photo)
+                changed.update(state.attrs.photo_id.history.deleted or ())
+
+
+@event.listens_for(Session, "before_commit")
+def _reindex_before_commit(session):
+    # Flush first, so the last changes are noted and their ids assigned
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    changed = session.info.pop("search_photo_ids", None)
+    if changed:
+        index_photos([item.id if isinstance(item, Photo) else item for item in changed if item is not None], session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_photos(session):
+    session.info.pop("search_photo_ids", None)
@@ -0,0 +1,43 @@
+from flask import Blueprint, request
+from app.storage import storage, load_local_policy
+
+storage_routes = Blueprint('storage', __name__)
+
+
+# Get Stored File
+@storage_routes.route('/files/<path:key>')
+def stored_file(key):
+    """
+    Serves a file from local storage, with Range support;
+    404 when storage is S3, which serves its own files
+    """
+    response = storage.send(key)
+    if response is None:
+        return {"error": "File could not be found"}, 404
+    return response
+
+
+# Direct Upload to Local Storage
+@storage_routes.route('/upload', methods=['POST'])
+def local_upload():
+    """
+    Stand-in for S3's presigned POST with local storage: takes the
+    key and policy fields from presign and the file, and stores it
+    if it matches the policy. Returns 204 like S3
+    """
+    policy = load_local_policy(request.form.get("policy", ""))
+    if not policy or request.form.get("key") != policy["key"]:
+        return {"error": "Upload policy is invalid or expired"}, 403
+
+    file = request.files.get("file")
+    if file is None:
+        return {"errors": {"file": ["No file was uploaded."]}}, 400
+
+    upload = storage.save(file.stream, policy["key"], policy["max_size"])
+    if "key" not in upload:
+        return {"errors": {"file": [upload["errors"]]}}, 400
+    if upload["content_type"] != policy["content_type"]:
+        storage.delete_many([policy["key"]])
+        return {"errors": {"file": ["File does not match the upload request."]}}, 400
+
+    return "", 204
@@ -0,0 +1,69 @@
+import hashlib
+
+
+# Leading bytes of each image type we accept, by content type
+IMAGE_SIGNATURES = {
+    "image/png": lambda head: head.startswith(b"\x89PNG\r\n\x1a\n"),
+    "image/jpeg": lambda head: head.startswith(b"\xff\xd8\xff"),
+    "image/webp": lambda head: head[:4] == b"RIFF" and head[8:12] == b"WEBP",
+}
+
+
+class UploadError(ValueError):
+    """
+    An upload was rejected: too large, empty, or not an image we accept
+    """
+
+
+def sniff_image_type(head):
+    """
+    Content type of an image from its first bytes, or None
+    if it is not a type we accept
+    """
+    for content_type, matches in IMAGE_SIGNATURES.items():
+        if matches(head):
+            return content_type
+    return None
+
+
+class UploadStream:
+    """
+    Reads an uploaded file exactly once, in chunks of at most
+    chunk_size bytes, so memory per upload stays constant.
+    While the chunks go by it hashes them, sniffs the image type from
+    the first one and stops with UploadError once max_size is passed.
+    content_type, sha256 and size are final after chunks() is exhausted
+    """
+
+    def __init__(self, stream, max_size, chunk_size):
+        self.stream = stream
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.content_type = None
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def chunks(self):
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                break
+
+            if self.size == 0:
+                self.content_type = sniff_image_type(chunk)
+                if self.content_type is None:
+                    raise UploadError("File is not a PNG, JPEG or WebP image.")
+
+            self.size += len(chunk)
+            if self.size > self.max_size:
+                raise UploadError(f"File is larger than {self.max_size // (1024 * 1024)} MB.")
+
+            self._hash.update(chunk)
+            yield chunk
+
+        if self.size == 0:
+            raise UploadError("File is empty.")
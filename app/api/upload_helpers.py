@@ -0,0 +1,342 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from sqlalchemy import func
+from app.models import db, Photo, Blob, UploadClaim
+from app.cache import user_key
+from app.storage import storage
+from .album_helpers import refresh_cover_url
+from .blob_helpers import blob_filename, acquire_blob, register_blob, mark_stored, release_file, release_photo_file, store_file
+from .cache_helpers import photo_keys, photo_album_ids, album_keys, bump_versions
+from .deletion_helpers import queue_deletions
+from .rendition_helpers import make_renditions, rendition_filename
+from .stream_helpers import UploadStream, UploadError
+
+
+# Photo.status values
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    The upload worker pool, created on first use so it is started
+    in each server process rather than in a parent that forks
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config["UPLOAD_WORKERS"],
+                thread_name_prefix="upload"
+            )
+        return _executor
+
+
+def stage_file(file):
+    """
+    Copies an uploaded FileStorage to the staging directory under its
+    (already unique) filename in one bounded-chunk pass and returns
+    {"path", "sha256", "size", "content_type"}.
+    Raises UploadError, leaving nothing staged, if the file is rejected
+    """
+    path = os.path.join(_staging_dir(), file.filename)
+
+    upload = UploadStream(
+        file.stream,
+        current_app.config["MAX_UPLOAD_SIZE"],
+        current_app.config["UPLOAD_CHUNK_SIZE"]
+    )
+    try:
+        with open(path, "wb") as staged:
+            for chunk in upload.chunks():
+                staged.write(chunk)
+    except UploadError:
+        os.remove(path)
+        raise
+
+    return {
+        "path": path,
+        "sha256": upload.sha256,
+        "size": upload.size,
+        "content_type": upload.content_type
+    }
+
+
+def _staging_dir():
+    staging_dir = current_app.config["UPLOAD_STAGING_DIR"] \
+        or os.path.join(tempfile.gettempdir(), "highrme-uploads")
+    os.makedirs(staging_dir, exist_ok=True)
+    return staging_dir
+
+
+def store_upload(file):
+    """
+    Stages an uploaded FileStorage and stores it now, in the request
+    (see store_file); returns {"key"} or {"errors"}
+    """
+    try:
+        staged = stage_file(file)
+    except UploadError as e:
+        return {"errors": str(e)}
+    return store_file(staged)
+
+
+def discard_staged(staged):
+    """
+    Removes a staged file that turned out not to need uploading
+    """
+    os.remove(staged["path"])
+
+
+def upload_renditions(path, filename):
+    """
+    Generates and uploads the renditions of a staged image and returns
+    them as [{"width", "key"}]; a rendition that fails is left out,
+    the photo still has its original
+    """
+    renditions = []
+    try:
+        rendered = make_renditions(path)
+    except Exception:
+        current_app.logger.exception("Renditions of %s failed", filename)
+        return renditions
+
+    for width, rendition_path in rendered:
+        try:
+            upload = storage.save_path(rendition_path, rendition_filename(filename, width))
+        finally:
+            os.remove(rendition_path)
+        if "key" in upload:
+            renditions.append({"width": width, "key": upload["key"]})
+    return renditions
+
+
+def finish_upload(photo_id, staged, replacing=False):
+    """
+    Runs on a worker: takes a reference to the staged file's blob,
+    stores the file and its renditions under their content-addressed
+    names and points the photo at them, bumping the versions of the
+    responses showing it.
+    A new photo is marked ready, or failed if the upload fails.
+    A replaced photo (replacing) keeps showing its old file until the
+    new one is up, then the old file's reference is released; if the
+    upload fails it keeps the old file.
+    A new photo that is no longer pending was failed by
+    fail_stale_uploads, which took over the reference; it is left alone
+    """
+    photo = _lock_photo(photo_id)
+    if photo is None or not (replacing or photo.status == PENDING):
+        # Deleted or failed before the upload started
+        db.session.commit()
+        os.remove(staged["path"])
+        return
+
+    filename = blob_filename(staged)
+    # Take the reference before the bytes go up, so the deletion drainer
+    # leaves the key alone. Identical bytes have the same names, so a blob
+    # another upload registered is shared, even one still going up: every
+    # photo on an unstored blob is pending on a worker storing it itself
+    blob = acquire_blob(staged["sha256"], pending=True) or register_blob(staged)
+    if not replacing:
+        photo.upload_started_at = datetime.now()
+    db.session.commit()
+    try:
+        upload = storage.save_path(staged["path"], filename)
+        renditions = upload_renditions(staged["path"], filename) if "key" in upload else None
+    finally:
+        os.remove(staged["path"])
+
+    photo = _lock_photo(photo_id)
+    if photo is not None and not (replacing or photo.status == PENDING):
+        # Failed while the upload ran, and fail_stale_uploads released the
+        # reference: the file goes too, unless a blob still has these bytes
+        if "key" in upload:
+            queue_deletions([filename] + [rendition["key"] for rendition in renditions or []])
+        db.session.commit()
+        return
+
+    if "key" in upload:
+        mark_stored(blob, renditions)
+    else:
+        queue_deletions(release_file(filename))
+        blob = None
+
+    if photo is None:
+        # Deleted while the upload ran
+        if blob:
+            queue_deletions(release_file(filename))
+        db.session.commit()
+        return
+
+    old_url = photo.aws_url
+    if blob:
+        # A failed photo being given a new file holds no file to release
+        if replacing and photo.status == READY:
+            queue_deletions(release_photo_file(photo))
+        photo.aws_url = filename
+        photo.renditions = blob.renditions
+        refresh_cover_url(photo)
+        photo.status = READY
+    elif not replacing:
+        photo.status = FAILED
+    bump_versions([
+        *photo_keys([photo_id]),
+        user_key(photo.author_id),
+        *album_keys(photo_album_ids(photo_id), members=photo.aws_url != old_url)
+    ])
+    db.session.commit()
+
+
+def _lock_photo(photo_id):
+    """
+    The photo, reloaded and locked until the transaction ends, so the
+    worker and fail_stale_uploads agree on whether it is still pending
+    """
+    return Photo.query.populate_existing().with_for_update() \
+        .filter(Photo.id == photo_id).first()
+
+
+def fail_stale_uploads():
+    """
+    Marks failed the photos still pending UPLOAD_STALE_AFTER seconds
+    after their upload started, or was queued if it never started: the
+    worker running it died with its process, and the staged file with
+    it. Releases the blob reference a started upload took; returns how
+    many photos were failed
+    """
+    cutoff = datetime.now() - timedelta(seconds=current_app.config["UPLOAD_STALE_AFTER"])
+    stale = Photo.query \
+        .filter(Photo.status == PENDING,
+                func.coalesce(Photo.upload_started_at, Photo.created_at) < cutoff) \
+        .with_for_update().all()
+
+    keys = photo_keys([photo.id for photo in stale])
+    for photo in stale:
+        if photo.upload_started_at is not None:
+            queue_deletions(release_file(photo.aws_url))
+        photo.status = FAILED
+        photo.upload_started_at = None
+        keys += [user_key(photo.author_id), *album_keys(photo_album_ids(photo.id), members=False)]
+    bump_versions(keys)
+    return len(stale)
+
+
+def finish_direct_upload(photo_id, key):
+    """
+    Runs on a worker: generates the renditions of a photo the browser
+    uploaded straight to storage (see finalize_upload) and points the
+    file's blob and the photo at them. The blob row stays locked while
+    they are recorded, so a concurrent release removes them with the file
+    """
+    path = os.path.join(_staging_dir(), key)
+    storage.load_path(key, path)
+    try:
+        renditions = upload_renditions(path, key)
+    finally:
+        os.remove(path)
+    if not renditions:
+        return
+
+    blob = Blob.query.with_for_update().filter(Blob.filename == key).first()
+    if blob is None:
+        # Released while the renditions were made: the photo is gone
+        queue_deletions([rendition["key"] for rendition in renditions])
+        db.session.commit()
+        return
+
+    blob.renditions = renditions
+    photo = db.session.get(Photo, photo_id)
+    if photo is not None and photo.aws_url == key:
+        photo.renditions = renditions
+        bump_versions([
+            *photo_keys([photo_id]),
+            user_key(photo.author_id),
+            *album_keys(photo_album_ids(photo_id), members=False)
+        ])
+    db.session.commit()
+
+
+def _run_in_app_context(app, job, photo_id, *args):
+    with app.app_context():
+        try:
+            job(photo_id, *args)
+        except Exception:
+            app.logger.exception("Upload of photo %s failed", photo_id)
+        finally:
+            db.session.remove()
+
+
+def submit_upload(photo_id, staged, replacing=False):
+    """
+    Queues storing a staged file (see stage_file) for photo_id.
+    The photo row must already be committed
+    """
+    app = current_app._get_current_object()
+    get_executor().submit(_run_in_app_context, app, finish_upload, photo_id, staged, replacing)
+
+
+def submit_direct_upload(photo_id, key):
+    """
+    Queues making the renditions of a finalized direct upload
+    (see finish_direct_upload). The photo row must already be committed
+    """
+    app = current_app._get_current_object()
+    get_executor().submit(_run_in_app_context, app, finish_direct_upload, photo_id, key)
+
+
+def _upload_serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="direct-upload")
+
+
+def sign_upload(user_id, filename, content_type, purpose):
+    """
+    Token handed out with presigned credentials; finalize trusts
+    only what it carries
+    """
+    return _upload_serializer().dumps({
+        "user_id": user_id,
+        "filename": filename,
+        "content_type": content_type,
+        "purpose": purpose
+    })
+
+
+def load_upload(token):
+    """
+    The signed upload details, or None if the token is forged or
+    older than the presigned credentials it came with
+    """
+    try:
+        return _upload_serializer().loads(token, max_age=_upload_token_max_age())
+    except BadSignature:
+        return None
+
+
+def _upload_token_max_age():
+    return current_app.config["UPLOAD_URL_EXPIRES"] * 2
+
+
+def expire_upload_claims():
+    """
+    Drops the claims of presigned uploads whose tokens have expired,
+    queueing the removal of each file that was never finalized (and
+    can't be now); returns how many were queued.
+    A finalize racing the sweep is safe: its file has a blob by the
+    time it commits, and the drainer skips keys with one (see drain_outbox)
+    """
+    cutoff = datetime.now() - timedelta(seconds=_upload_token_max_age())
+    expired = UploadClaim.query.filter(UploadClaim.created_at < cutoff)
+    unclaimed = [key for key, in expired.filter(UploadClaim.claimed_at.is_(None))
+                 .with_entities(UploadClaim.key)]
+    queue_deletions(unclaimed)
+    expired.delete(synchronize_session=False)
+    return len(unclaimed)
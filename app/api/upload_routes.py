@@ -0,0 +1,131 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import login_required, current_user
+from datetime import datetime
+from sqlalchemy import update
+from app.models import db, Photo, User, UploadClaim
+from app.models.loaders import PHOTO_FULL
+from app.forms import PresignUploadForm, FinalizeUploadForm
+from app.api.aws_helpers import get_unique_filename
+from app.api.blob_helpers import release_file, track_file
+from app.api.cache_helpers import user_keys, bump_versions
+from app.api.login_helpers import forget_user
+from app.api.profile_helpers import user_profile
+from app.api.deletion_helpers import queue_deletions
+from app.api.stream_helpers import sniff_image_type
+from app.api.upload_helpers import READY, sign_upload, load_upload, submit_direct_upload
+from app.cache import user_key, user_photos_key
+from app.storage import storage
+
+upload_routes = Blueprint('uploads', __name__)
+
+
+# Presign Upload
+@upload_routes.route('/presign', methods=['POST'])
+@login_required
+def presign_upload():
+    """
+    Takes filename, content_type and purpose (photo, cover_photo
+    or profile_pic); returns credentials for the browser to POST the
+    file straight to storage ("upload": url and form fields),
+    its final "url", and a "token" to pass to finalize once uploaded
+    """
+    form = PresignUploadForm()
+    form['csrf_token'].data = request.cookies['csrf_token']
+    if form.validate_on_submit():
+        filename = get_unique_filename(form.data["filename"])
+        content_type = form.data["content_type"]
+
+        post = storage.presign_post(
+            filename,
+            content_type,
+            current_app.config["MAX_UPLOAD_SIZE"],
+            current_app.config["UPLOAD_URL_EXPIRES"]
+        )
+        if "url" not in post:
+            return {"errors": post["errors"]}, 500
+
+        # Recorded so the file can be removed if it is never finalized
+        db.session.add(UploadClaim(key=filename, user_id=current_user.id))
+        db.session.commit()
+
+        return {
+            "upload": post,
+            "url": storage.url(filename),
+            "token": sign_upload(current_user.id, filename, content_type, form.data["purpose"])
+        }
+    else:
+        return {"errors": form.errors}, 400
+
+
+# Finalize Upload
+@upload_routes.route('/finalize', methods=['POST'])
+@login_required
+def finalize_upload():
+    """
+    Takes the token from presign (plus caption and description for
+    photos) once the browser's upload has finished;
+    checks the file is in storage and really is the image type signed
+    for, then creates the photo (returns photo.to_dict(), 201) or sets
+    the user's cover photo or profile picture (returns the user's
+    profile). Each token can be finalized once.
+    A photo's renditions are made in the background; it shows its
+    original until they are up
+    """
+    form = FinalizeUploadForm()
+    form['csrf_token'].data = request.cookies['csrf_token']
+    if not form.validate_on_submit():
+        return {"errors": form.errors}, 400
+
+    upload = load_upload(form.data["token"])
+    if not upload:
+        return {"errors": {"token": ["Upload token is invalid or expired."]}}, 400
+    if upload["user_id"] != current_user.id:
+        return {"error": "Upload belongs to another user"}, 403
+
+    info = storage.info(upload["filename"])
+    if info is None:
+        return {"errors": {"token": ["File has not been uploaded."]}}, 400
+    if info["size"] > current_app.config["MAX_UPLOAD_SIZE"] \
+            or sniff_image_type(storage.read_head(upload["filename"], 16)) != upload["content_type"]:
+        return {"errors": {"token": ["Uploaded file does not match the upload request."]}}, 400
+
+    key = upload["filename"]
+    claimed = db.session.execute(
+        update(UploadClaim)
+        .where(UploadClaim.key == key, UploadClaim.claimed_at.is_(None))
+        .values(claimed_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount == 0:
+        return {"errors": {"token": ["This upload has already been finalized."]}}, 409
+    track_file(key, info["size"], upload["content_type"])
+
+    if upload["purpose"] == "photo":
+        new_photo = Photo(
+            author_id = current_user.id,
+            aws_url = key,
+            caption = form.data["caption"],
+            description = form.data["description"],
+            status = READY
+        )
+        db.session.add(new_photo)
+        bump_versions([user_key(current_user.id), user_photos_key(current_user.id)])
+        db.session.commit()
+        submit_direct_upload(new_photo.id, key)
+
+        new_photo = Photo.query.options(*PHOTO_FULL).populate_existing().get(new_photo.id)
+        return jsonify(new_photo.to_dict()), 201
+
+    user = User.query.get(current_user.id)
+    if upload["purpose"] == "cover_photo":
+        queue_deletions(release_file(user.cover_photo_url))
+        user.cover_photo_url = key
+    else:
+        queue_deletions(release_file(user.profile_image_url))
+        user.profile_image_url = key
+
+    bump_versions(user_keys(user.id))
+    db.session.commit()
+    forget_user(user.id)
+
+    return user_profile(user)
@@ -2,7 +2,15 @@ from flask import Blueprint, jsonify, request
 from flask_login import login_required
 from app.models import db, User
 from app.forms import EditUserForm, UserBioForm
-from app.api.aws_helpers import get_unique_filename, upload_file_to_s3, remove_file_from_s3
+from app.api.aws_helpers import get_unique_filename
+from app.api.blob_helpers import release_file
+from app.api.deletion_helpers import queue_deletions
+from app.api.upload_helpers import store_upload
+from app.api.cache_helpers import user_keys, bump_versions, user_version
+from app.api.login_helpers import forget_user
+from app.api.pagination_helpers import get_page_args
+from app.api.profile_helpers import user_profile, user_photos_page, user_albums_page
+from app.cache import cache, user_key
 
 user_routes = Blueprint('users', __name__)
 
@@ -21,10 +29,57 @@ def users():
 @login_required
 def user(id):
     """
-    Query for a user by id and returns that user in a dictionary
+    Query for a user by id and returns their profile: the user, how many
+    photos and albums they have, and the first page of each
+    (see /<id>/photos and /<id>/albums for the rest)
+    Served from the response cache when possible
     """
-    user = User.query.get(id)
-    return user.to_dict_with_pics()
+    def build():
+        user = User.query.get(id)
+        return user_profile(user) if user else None
+
+    response = cache.cached_json(user_key(id), user_version(id), build)
+    if response:
+        return response
+    return {'error': 'User could not be found'}, 404
+
+
+@user_routes.route('/<int:id>/photos')
+@login_required
+def user_photos(id):
+    """
+    One page of a user's photos, newest first, for their profile's
+    photo stream. Pass ?limit= for page size and the returned
+    next_cursor (photos_next_cursor on the profile) as ?cursor=
+    """
+    if not db.session.get(User, id):
+        return {'error': 'User could not be found'}, 404
+    try:
+        limit, cursor = get_page_args(request.args)
+        photos, next_cursor = user_photos_page(id, limit, cursor)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    return {"photos": photos, "next_cursor": next_cursor}
+
+
+@user_routes.route('/<int:id>/albums')
+@login_required
+def user_albums(id):
+    """
+    One page of a user's albums, newest first, each with its pics.
+    Pass ?limit= for page size and the returned next_cursor
+    (albums_next_cursor on the profile) as ?cursor=
+    """
+    if not db.session.get(User, id):
+        return {'error': 'User could not be found'}, 404
+    try:
+        limit, cursor = get_page_args(request.args)
+        albums, next_cursor = user_albums_page(id, limit, cursor)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    return {"albums": albums, "next_cursor": next_cursor}
 
 @user_routes.route('/<int:id>/edit', methods=["PUT"])
 @login_required
@@ -46,25 +101,36 @@ def edit_user(id):
         cover_photo = form.data["cover_photo"]
         profile_pic = form.data["profile_pic"]
 
+        # Both files are stored before the user is touched (see store_file).
+        # Files replaced below are removed once nothing uses them;
+        # pictures from before deduplication are left alone, as before
+        cover_key = profile_key = None
         if cover_photo:
             cover_photo.filename = get_unique_filename(cover_photo.filename)
-            upload = upload_file_to_s3(cover_photo)
-
-            if "url" not in upload:
-                return upload["errors"]
+            upload = store_upload(cover_photo)
 
-            cover_url = upload["url"]
-            user.cover_photo_url = cover_url
+            if "key" not in upload:
+                return {"cover_photo": [upload["errors"]]}, 400
+            cover_key = upload["key"]
 
         if profile_pic:
             profile_pic.filename = get_unique_filename(profile_pic.filename)
-            upload = upload_file_to_s3(profile_pic)
+            upload = store_upload(profile_pic)
 
-            if "url" not in upload:
-                return upload["errors"]
+            if "key" not in upload:
+                if cover_key:
+                    queue_deletions(release_file(cover_key))
+                    db.session.commit()
+                return {"profile_pic": [upload["errors"]]}, 400
+            profile_key = upload["key"]
 
-            profile_pic_url = upload["url"]
-            user.profile_image_url = profile_pic_url
+        if cover_key:
+            queue_deletions(release_file(user.cover_photo_url))
+            user.cover_photo_url = cover_key
+
+        if profile_key:
+            queue_deletions(release_file(user.profile_image_url))
+            user.profile_image_url = profile_key
 
 
         if new_first:
@@ -74,8 +140,11 @@ def edit_user(id):
         if new_username:
             user.username = new_username
 
+        bump_versions(user_keys(id))
         db.session.commit()
-        return user.to_dict_with_pics()
+        forget_user(id)
+
+        return user_profile(user)
 
     else:
         return form.errors, 400
@@ -88,9 +157,11 @@ def set_bio(id):
     if form.validate_on_submit():
         user = User.query.get(id)
         user.bio = form.data["bio"]
+        bump_versions(user_keys(id))
         db.session.commit()
+        forget_user(id)
 
-        return user.to_dict_with_pics()
+        return user_profile(user)
 
     else:
         return form.errors
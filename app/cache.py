@@ -0,0 +1,245 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+
+
+class LRUBackend:
+    """
+    In-process cache: a size-bounded, thread-safe LRU with a TTL.
+    Each gunicorn worker holds its own copy, so an invalidation only
+    reaches the worker that handled the write; the TTL bounds how long
+    the others can serve a stale entry
+    """
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class SharedBackend:
+    """
+    Cache shared by every worker, stored in an external key/value
+    client. The client needs get(key), set(key, value, ex=seconds)
+    and delete(*keys): a redis.Redis instance, or MemoryClient below
+    """
+
+    def __init__(self, client, ttl=300, prefix="highrme:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+
+class MemoryClient:
+    """
+    Local stand-in for a shared cache server, implementing the subset
+    of the redis client API SharedBackend uses.
+    For development and tests, where no cache server is running
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            expires = time.monotonic() + ex if ex else None
+            self._data[key] = (value, expires)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class NullBackend:
+    """
+    Caching disabled: every lookup misses
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+
+def make_backend(config):
+    """
+    Builds the backend named by CACHE_BACKEND:
+    lru (default), redis (CACHE_URL), memory or none
+    """
+    kind = config.get("CACHE_BACKEND", "lru")
+    ttl = config.get("CACHE_TTL", 60)
+
+    if kind == "lru":
+        return LRUBackend(config.get("CACHE_MAX_ENTRIES", 1024), ttl)
+    if kind == "redis":
+        import redis
+        return SharedBackend(redis.Redis.from_url(config["CACHE_URL"]), ttl)
+    if kind == "memory":
+        return SharedBackend(MemoryClient(), ttl)
+    if kind == "none":
+        return NullBackend()
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
+
+
+class ResponseCache:
+    """
+    Caches rendered JSON response bodies by key and version.
+    A response's version is read from the database before anything is
+    built (see the version readers in cache_helpers), and write routes
+    bump it in the transaction that changes the data, so it is the same
+    in every worker and with caching off. It is the response's ETag:
+    a matching If-None-Match is answered without building the body.
+    Bodies are stored under key@version, so a write never has to find
+    and drop them; the TTL clears out old versions
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["response_cache"] = make_backend(app.config)
+
+    @property
+    def backend(self):
+        # Each app has its own, so building a second app (perf budgets)
+        # never reconfigures the first
+        return current_app.extensions["response_cache"]
+
+    def cached_json(self, key, version, build):
+        """
+        Returns a JSON response for key at version, tagged with it as a
+        weak ETag: a 304 without the body if If-None-Match matches,
+        otherwise the body cached under key@version, or build()'s JSON.
+        Returns None, caching nothing, if version or build() is None,
+        so the route can answer 404
+        """
+        if version is None:
+            return None
+
+        if request.if_none_match.contains_weak(version):
+            response = current_app.response_class(status=304)
+        else:
+            body = self.backend.get(f"{key}@{version}")
+            if body is None:
+                obj = build()
+                if obj is None:
+                    return None
+                body = current_app.json.dumps(obj).encode()
+                self.backend.set(f"{key}@{version}", body)
+            response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+
+        # Browsers keep the body but revalidate it on every use
+        response.set_etag(version, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+
+cache = ResponseCache()
+
+
+class SnapshotCache:
+    """
+    Caches small JSON-able dicts (column snapshots of rows) by key,
+    in the same kind of backend as the response cache but with their
+    own, shorter TTL (SNAPSHOT_CACHE_TTL). Writers delete the keys of
+    rows they change; the TTL bounds staleness in other workers
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["snapshot_cache"] = make_backend({**app.config, "CACHE_TTL": app.config["SNAPSHOT_CACHE_TTL"]})
+
+    @property
+    def backend(self):
+        return current_app.extensions["snapshot_cache"]
+
+    def get(self, key):
+        raw = self.backend.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, snapshot):
+        self.backend.set(key, json.dumps(snapshot))
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+
+snapshots = SnapshotCache()
+
+
+def photo_key(photo_id):
+    return f"photo:{photo_id}"
+
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+def user_snapshot_key(user_id):
+    return f"user_snapshot:{user_id}"
+
+
+def user_photos_key(user_id):
+    return f"user_photos:{user_id}"
+
+
+ALBUMS_KEY = "albums:all"
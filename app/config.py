@@ -10,4 +10,74 @@ class Config:
     # so the connection uri must be updated here (for production)
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         'DATABASE_URL').replace('postgres://', 'postgresql://')
-    SQLALCHEMY_ECHO = True
\ No newline at end of file
+    # Logs every statement; for per-request query counts and timings see
+    # PERF_INSTRUMENTATION below
+    SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO') == 'true'
+    # Password hashing, as werkzeug's method:hash:cost. Stored hashes made
+    # with another method or cost are rehashed at the user's next login,
+    # so changing it tunes the CPU spent per login without a migration
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+    # Per-request metrics (see app/instrumentation.py): SQL count and time,
+    # storage and serialization time, logged as one JSON line per request
+    # to the app.perf logger and sent as a Server-Timing header (off in
+    # production by default: it tells clients about our internals).
+    # A statement run more than PERF_REPEATED_QUERY_LIMIT times in one
+    # request is logged as a possible N+1
+    PERF_INSTRUMENTATION = os.environ.get('PERF_INSTRUMENTATION', 'true') == 'true'
+    PERF_SERVER_TIMING = os.environ.get(
+        'PERF_SERVER_TIMING', 'false' if os.environ.get('FLASK_ENV') == 'production' else 'true') == 'true'
+    PERF_LOG_LEVEL = os.environ.get('PERF_LOG_LEVEL', 'INFO')
+    PERF_REPEATED_QUERY_LIMIT = int(os.environ.get('PERF_REPEATED_QUERY_LIMIT', 10))
+    # Response cache for photo, album and user reads (see app/cache.py):
+    # lru (per-worker, default), redis (shared, needs CACHE_URL),
+    # memory (local stand-in for a shared server) or none
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')
+    CACHE_URL = os.environ.get('CACHE_URL')
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 60))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    # Snapshots of logged-in users for the login manager's user_loader,
+    # in the same kind of cache; short-lived, as an edit only clears
+    # the snapshot in the worker that made it when the cache is per-worker
+    SNAPSHOT_CACHE_TTL = int(os.environ.get('SNAPSHOT_CACHE_TTL', 30))
+    # Background photo uploads (see app/api/upload_helpers.py): files are
+    # staged here until a worker thread sends them to storage
+    UPLOAD_STAGING_DIR = os.environ.get('UPLOAD_STAGING_DIR')
+    UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 4))
+    # A photo still pending this many seconds after its upload started (or
+    # was queued) lost its worker; `flask repair uploads` marks it failed
+    UPLOAD_STALE_AFTER = int(os.environ.get('UPLOAD_STALE_AFTER', 900))
+    # Resized WebP copies made of each uploaded photo (needs Pillow),
+    # in a pool of RENDITION_PROCESSES processes
+    RENDITION_WIDTHS = [int(width) for width in
+                        os.environ.get('RENDITION_WIDTHS', '200,400,800,1600').split(',')]
+    RENDITION_QUALITY = int(os.environ.get('RENDITION_QUALITY', 80))
+    RENDITION_PROCESSES = int(os.environ.get('RENDITION_PROCESSES', 2))
+    # Upload limits, for direct-to-storage uploads (see app/api/upload_routes.py)
+    # and uploads through Flask (see app/api/stream_helpers.py)
+    MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 20 * 1024 * 1024))
+    # Uploads through Flask are read in chunks of this size, each sent to
+    # storage as one multipart part (S3 parts must be at least 5 MB)
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+    # Werkzeug rejects larger request bodies (413) before parsing them;
+    # the slack is for the other form fields
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_SIZE + 64 * 1024
+    UPLOAD_URL_EXPIRES = int(os.environ.get('UPLOAD_URL_EXPIRES', 600))
+    # Where uploaded files are stored (see app/storage.py): s3, the default
+    # when S3_BUCKET is set (S3_ENDPOINT_URL points at an S3-compatible
+    # stand-in such as MinIO), or local, files under STORAGE_ROOT served by
+    # the app at STORAGE_URL. Behind nginx, set STORAGE_ACCEL_REDIRECT to an
+    # internal location aliased to STORAGE_ROOT to hand files off with
+    # X-Accel-Redirect; USE_X_SENDFILE does the same for X-Sendfile servers
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND')
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_KEY = os.environ.get('S3_KEY')
+    S3_SECRET = os.environ.get('S3_SECRET')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+    STORAGE_ROOT = os.environ.get('STORAGE_ROOT')
+    STORAGE_URL = os.environ.get('STORAGE_URL', '/api/storage/files/')
+    STORAGE_ACCEL_REDIRECT = os.environ.get('STORAGE_ACCEL_REDIRECT')
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE') == 'true'
+    # Storage deletion outbox (see app/api/deletion_helpers.py): keys per
+    # delete request (S3 takes at most 1000), and seconds between retries
+    STORAGE_DELETE_BATCH = int(os.environ.get('STORAGE_DELETE_BATCH', 1000))
+    STORAGE_DELETE_INTERVAL = int(os.environ.get('STORAGE_DELETE_INTERVAL', 60))
@@ -5,3 +5,4 @@ from .albums import CreateAlbumForm, EditAlbumForm
 from .edit_user_form import EditUserForm
 from .comments import CommentForm
 from .user_bio_form import UserBioForm
+from .uploads import PresignUploadForm, FinalizeUploadForm
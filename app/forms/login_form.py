@@ -4,19 +4,26 @@ from wtforms.validators import DataRequired, Email, ValidationError
 from app.models import User
 
 
+def lookup_user(form):
+    """
+    The user with the form's email, or None; queried once per form
+    and kept for the other validators and the login route
+    """
+    if not hasattr(form, "user"):
+        form.user = User.query.filter(User.email == form.data['email']).first()
+    return form.user
+
+
 def user_exists(form, field):
     # Checking if user exists
-    email = field.data
-    user = User.query.filter(User.email == email).first()
-    if not user:
+    if not lookup_user(form):
         raise ValidationError('Email provided not found.')
 
 
 def password_matches(form, field):
     # Checking if password matches
     password = field.data
-    email = form.data['email']
-    user = User.query.filter(User.email == email).first()
+    user = lookup_user(form)
     if not user:
         raise ValidationError('No such user exists.')
     if not user.check_password(password):
@@ -25,4 +32,4 @@ def password_matches(form, field):
 
 class LoginForm(FlaskForm):
     email = StringField('email', validators=[DataRequired(), user_exists])
-    password = StringField('password', validators=[DataRequired(), password_matches])
\ No newline at end of file
+    password = StringField('password', validators=[DataRequired(), password_matches])
@@ -1,29 +1,37 @@
+import re
 from flask_wtf import FlaskForm
 from wtforms import StringField
 from wtforms.validators import DataRequired, Email, ValidationError
-from app.models import User
 
 
-def user_exists(form, field):
-    # Checking if user exists
-    email = field.data
-    user = User.query.filter(User.email == email).first()
-    if user:
-        raise ValidationError('Email address is already in use.')
+# Email and username are unique in the database; sign_up maps a
+# violation of either constraint to these errors
+UNIQUE_FIELD_ERRORS = {
+    'email': 'Email address is already in use.',
+    'username': 'Username is already in use.',
+}
 
+# Names the violated constraint: "users.email" on SQLite,
+# "users_email_key" on Postgres
+UNIQUE_VIOLATION = re.compile(r"\busers[._](email|username)\b")
 
-def username_exists(form, field):
-    # Checking if username is already in use
-    username = field.data
-    user = User.query.filter(User.username == username).first()
-    if user:
-        raise ValidationError('Username is already in use.')
+
+def unique_field_errors(error):
+    """
+    Form-style errors ({field: [message]}) for an IntegrityError raised
+    inserting a user, or None if it isn't a known uniqueness violation
+    """
+    # Only the first line: Postgres adds the offending value after it
+    match = UNIQUE_VIOLATION.search(str(error.orig).splitlines()[0])
+    if not match:
+        return None
+    field = match.group(1)
+    return {field: [UNIQUE_FIELD_ERRORS[field]]}
 
 
 class SignUpForm(FlaskForm):
-    username = StringField(
-        'username', validators=[DataRequired(), username_exists])
+    username = StringField('username', validators=[DataRequired()])
     first_name = StringField('first_name', validators=[DataRequired()])
     last_name = StringField('last_name', validators=[DataRequired()])
-    email = StringField('email', validators=[DataRequired(), user_exists])
+    email = StringField('email', validators=[DataRequired()])
     password = StringField('password', validators=[DataRequired()])
@@ -0,0 +1,2 @@
+from .presign_upload_form import PresignUploadForm, UPLOAD_PURPOSES
+from .finalize_upload_form import FinalizeUploadForm
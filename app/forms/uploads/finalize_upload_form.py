@@ -0,0 +1,13 @@
+from flask_wtf import FlaskForm
+from wtforms import StringField
+from wtforms.validators import DataRequired
+
+
+class FinalizeUploadForm(FlaskForm):
+    """
+    token comes from the presign response;
+    caption and description only apply to photos
+    """
+    token = StringField("Token", validators=[DataRequired()])
+    caption = StringField('Caption')
+    description = StringField('Description')
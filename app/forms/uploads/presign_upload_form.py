@@ -0,0 +1,27 @@
+from flask_wtf import FlaskForm
+from wtforms import StringField, SelectField
+from wtforms.validators import DataRequired, ValidationError
+from app.api.aws_helpers import ALLOWED_EXTENSIONS
+from app.api.stream_helpers import IMAGE_SIGNATURES
+
+# What an uploaded file becomes once finalized
+UPLOAD_PURPOSES = ["photo", "cover_photo", "profile_pic"]
+
+
+def allowed_extension(form, field):
+    # Same file types the upload forms accept
+    filename = field.data or ""
+    if "." not in filename or filename.rsplit(".", 1)[1].lower() not in ALLOWED_EXTENSIONS:
+        raise ValidationError(f"File type must be one of: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+
+
+def image_content_type(form, field):
+    # Only types finalize can recognise from the stored bytes
+    if field.data not in IMAGE_SIGNATURES:
+        raise ValidationError(f"Content type must be one of: {', '.join(IMAGE_SIGNATURES)}")
+
+
+class PresignUploadForm(FlaskForm):
+    filename = StringField("Filename", validators=[DataRequired(), allowed_extension])
+    content_type = StringField("Content Type", validators=[DataRequired(), image_content_type])
+    purpose = SelectField("Purpose", choices=UPLOAD_PURPOSES, validators=[DataRequired()])
@@ -0,0 +1,161 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger("app.perf")
+
+# Expanded IN lists differ in length from call to call;
+# collapsed, "IN (?, ?)" and "IN (?, ?, ?)" are the same statement shape
+IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s)\s*,)*\s*(?:\?|%\(\w+\)s|%s)\s*\)")
+
+
+def statement_shape(statement):
+    """
+    The statement with IN lists collapsed, for counting repeats
+    """
+    return IN_LIST.sub("(...)", statement)
+
+
+class RequestMetrics:
+    """
+    What one request spent its time on: SQL statements (count, time,
+    and how often each statement shape ran), storage calls and
+    JSON serialization
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.shapes = Counter()
+        self.timings = {"db": 0.0, "storage": 0.0, "serialize": 0.0}
+        self.calls = Counter()
+        self._active = set()
+
+
+def current_metrics():
+    """
+    The current request's metrics, or None outside a request
+    (background workers, CLI commands) or with instrumentation off
+    """
+    if not has_request_context():
+        return None
+    return g.get("perf_metrics")
+
+
+@contextmanager
+def timed(name):
+    """
+    Adds the time spent in the block to the request's name timing.
+    Nested blocks with the same name are counted once
+    """
+    metrics = current_metrics()
+    if metrics is None or name in metrics._active:
+        yield
+        return
+
+    metrics._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - start
+        metrics.calls[name] += 1
+        metrics._active.discard(name)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_metrics() is not None:
+        conn.info.setdefault("perf_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = current_metrics()
+    started = conn.info.get("perf_started")
+    if metrics is None or not started:
+        return
+    metrics.timings["db"] += time.perf_counter() - started.pop()
+    metrics.queries += 1
+    metrics.shapes[statement_shape(statement)] += 1
+
+
+class RequestInstrumentation:
+    """
+    Collects RequestMetrics for every request. At the end of each one it
+    logs a JSON line to the app.perf logger, adds a Server-Timing header
+    (PERF_SERVER_TIMING) and warns when one statement shape ran more than
+    PERF_REPEATED_QUERY_LIMIT times, the mark of a lazy load in a loop
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        level = app.config["PERF_LOG_LEVEL"]
+        app.extensions["instrumentation"] = {
+            "log_level": logging.getLevelName(level.upper()) if isinstance(level, str) else level
+        }
+        if not app.config["PERF_INSTRUMENTATION"]:
+            return
+        # The shared logger lets everything through; each app's
+        # PERF_LOG_LEVEL is applied in _finish
+        logger.setLevel(logging.DEBUG)
+        # Creating app.logger installs Flask's default handler on the
+        # "app" logger, which app.perf propagates to
+        app.logger
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g.perf_metrics = RequestMetrics()
+
+    def _finish(self, response):
+        metrics = g.pop("perf_metrics", None)
+        if metrics is None:
+            return response
+        total = time.perf_counter() - metrics.start
+
+        if current_app.config["PERF_SERVER_TIMING"]:
+            entries = [f'db;dur={metrics.timings["db"] * 1000:.1f};desc="{metrics.queries} queries"']
+            entries += [
+                f"{name};dur={metrics.timings[name] * 1000:.1f}"
+                for name in ("storage", "serialize") if metrics.calls[name]
+            ]
+            entries.append(f"total;dur={total * 1000:.1f}")
+            response.headers.add("Server-Timing", ", ".join(entries))
+
+        level = current_app.extensions["instrumentation"]["log_level"]
+        if level <= logging.INFO:
+            logger.info(json.dumps({
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "total_ms": round(total * 1000, 1),
+                "db_ms": round(metrics.timings["db"] * 1000, 1),
+                "queries": metrics.queries,
+                "storage_ms": round(metrics.timings["storage"] * 1000, 1),
+                "serialize_ms": round(metrics.timings["serialize"] * 1000, 1),
+            }))
+
+        limit = current_app.config["PERF_REPEATED_QUERY_LIMIT"]
+        for shape, count in metrics.shapes.most_common():
+            if count <= limit or level > logging.WARNING:
+                break
+            logger.warning(
+                "Possible N+1: %s %s ran one statement %s times: %s",
+                request.method, request.path, count, " ".join(shape.split())[:300]
+            )
+        return response
+
+
+instrumentation = RequestInstrumentation()
@@ -0,0 +1,52 @@
+from flask.json.provider import DefaultJSONProvider
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib provider
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+    Output matches DefaultJSONProvider (sorted keys, HTTP dates),
+    responses are encoded straight to bytes
+    """
+
+    def _options(self):
+        # Dates are passed through to self.default so they keep the
+        # HTTP-date format the stdlib provider has always produced
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options())
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+class TimedProviderMixin:
+    """
+    Counts time spent encoding toward the request's serialize timing
+    """
+
+    def dumps(self, obj, **kwargs):
+        with timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        with timed("serialize"):
+            return super().response(*args, **kwargs)
+
+
+class JSONProvider(TimedProviderMixin, OrjsonProvider if orjson is not None else DefaultJSONProvider):
+    pass
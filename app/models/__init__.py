@@ -6,3 +6,7 @@ from .comment import Comment
 from .reply import Reply
 from .album import Album
 from .album_photo import album_photos
+from .blob import Blob
+from .storage_deletion import StorageDeletion
+from .upload_claim import UploadClaim
+from .response_version import ResponseVersion
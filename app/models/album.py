@@ -1,5 +1,6 @@
 from .db import db, environment, SCHEMA, add_prefix_for_prod
 from .album_photo import album_photos
+from app.storage import storage
 from datetime import datetime
 
 class Album(db.Model):
@@ -9,8 +10,13 @@ class Album(db.Model):
         __table_args__ = {'schema': SCHEMA}
 
     id = db.Column(db.Integer, primary_key=True)
+    # The cover and the number of photos are kept on the row by
+    # album_helpers whenever membership changes, so summaries need no join.
+    # cover_photo_url is the cover photo's storage key (older rows: URL)
+    cover_photo_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('photos.id'), ondelete='SET NULL'))
     cover_photo_url = db.Column(db.String)
-    author_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')))
+    photo_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    author_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), index=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(500))
     created_at = db.Column(db.Date, default=datetime.today)
@@ -31,7 +37,7 @@ class Album(db.Model):
         'id': self.id,
         'title': self.title,
         'description': self.description,
-        'cover_photo': self.album_photos[0].aws_url,
+        'cover_photo': storage.url(self.cover_photo_url),
         'author': self.author.to_dict(),
         'pics': [photo.to_dict_no_author() for photo in self.album_photos],
         'created_at': self.created_at
@@ -42,7 +48,7 @@ class Album(db.Model):
         'id': self.id,
         'title': self.title,
         'description': self.description,
-        'cover_photo': self.album_photos[0].aws_url,
+        'cover_photo': storage.url(self.cover_photo_url),
         'created_at': self.created_at,
-        'length': len(self.album_photos)
+        'length': self.photo_count
         }
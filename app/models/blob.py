@@ -0,0 +1,30 @@
+from .db import db, environment, SCHEMA
+from datetime import datetime
+
+
+class Blob(db.Model):
+    """
+    One stored image file, keyed by the sha256 of its bytes.
+    ref_count is how many photos and user pictures point at it;
+    the file (and its renditions) is removed when it drops to zero.
+    A row is written before its file goes up and marked stored once it
+    is; only stored blobs are shared with new uploads.
+    A file the browser uploaded straight to storage was never hashed:
+    its row has no sha256 and is never shared
+    """
+    __tablename__ = 'blobs'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True)
+    # Storage key
+    filename = db.Column(db.String(100), nullable=False, unique=True)
+    size = db.Column(db.Integer, nullable=False)
+    content_type = db.Column(db.String(50), nullable=False)
+    # Same shape as Photo.renditions
+    renditions = db.Column(db.JSON)
+    ref_count = db.Column(db.Integer, nullable=False, default=1)
+    stored = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
@@ -8,8 +8,8 @@ class Comment(db.Model):
         __table_args__ = {'schema': SCHEMA}
 
     id = db.Column(db.Integer, primary_key=True)
-    author_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')))
-    photo_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('photos.id')))
+    author_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), index=True)
+    photo_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('photos.id')), index=True)
     content = db.Column(db.String, nullable=False)
     created_at = db.Column(db.Date, default=datetime.today)
 
@@ -0,0 +1,38 @@
+from sqlalchemy.orm import joinedload, selectinload
+from .photo import Photo
+from .comment import Comment
+from .reply import Reply
+from .album import Album
+
+
+# Loader strategies, one per serialization shape.
+# Apply with query.options(*SHAPE) so every relationship the matching
+# to_dict walks is fetched up front: many-to-one hops are JOINed into
+# the parent query, collections are fetched with one IN query per level,
+# so the query count stays fixed however many rows come back.
+
+
+# Photo.to_dict
+PHOTO_FULL = (
+    joinedload(Photo.author),
+    selectinload(Photo.comments).joinedload(Comment.author),
+    selectinload(Photo.comments).selectinload(Comment.replies).joinedload(Reply.author),
+    selectinload(Photo.photo_albums),
+)
+
+# Album.to_dict
+ALBUM_FULL = (
+    joinedload(Album.author),
+    selectinload(Album.album_photos),
+)
+
+# Comment.to_dict_no_photo
+COMMENT_FULL = (
+    joinedload(Comment.author),
+    selectinload(Comment.replies).joinedload(Reply.author),
+)
+
+# Reply.to_dict
+REPLY_FULL = (
+    joinedload(Reply.author),
+)
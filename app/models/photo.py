@@ -1,5 +1,8 @@
+from sqlalchemy import event, DDL
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from .db import db, environment, SCHEMA, add_prefix_for_prod
 from .album_photo import album_photos
+from app.storage import storage
 from datetime import datetime
 
 class Photo(db.Model):
@@ -13,15 +16,40 @@ class Photo(db.Model):
         return datetime.now()
 
 
+    __table_args__ = (
+        # Feed ordering, and a user's photo stream (author_id prefix)
+        db.Index('ix_photos_created_at_id', 'created_at', 'id'),
+        db.Index('ix_photos_author_id_created_at_id', 'author_id', 'created_at', 'id'),
+    )
+
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ += ({'schema': SCHEMA},)
 
     id = db.Column(db.Integer, primary_key=True)
     author_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')))
+    # Storage key of the file (older rows hold its absolute URL),
+    # resolved to a URL by the active storage backend
     aws_url = db.Column(db.String, nullable=False)
     caption = db.Column(db.String(100))
     description = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=default_time, nullable=False)
+    # pending while the upload runs in the background, then ready or failed
+    status = db.Column(db.String(20), default='ready', server_default='ready', nullable=False)
+    # Set by the upload worker when it takes the file's blob reference
+    # for a pending photo (see finish_upload and fail_stale_uploads)
+    upload_started_at = db.Column(db.DateTime)
+    # Resized WebP copies, [{"width", "key"}] smallest first; null until generated
+    renditions = db.Column(db.JSON)
+    # Caption, description and comment text for full-text search on
+    # Postgres (see search_helpers); unused on SQLite, which has photo_search
+    search_vector = db.deferred(db.Column(TSVECTOR().with_variant(db.Text, 'sqlite')))
+    # Kept on the row by the comment and reply routes (see
+    # counter_helpers); `flask repair counts` recomputes them
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    reply_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped with every write that changes to_dict (see cache_helpers);
+    # GET /api/photos/<id> answers If-None-Match from it
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
 
 
@@ -42,25 +70,61 @@ class Photo(db.Model):
         back_populates="album_photos"
     )
 
+    @staticmethod
+    def build_srcset(renditions):
+        """
+        An <img> srcset for the renditions, or None if there are none
+        """
+        if not renditions:
+            return None
+        return ", ".join(f"{storage.url(r['key'])} {r['width']}w" for r in renditions)
+
     def to_dict(self):
         return {
             'id': self.id,
             'author': self.author.to_dict(),
-            'url': self.aws_url,
+            'url': storage.url(self.aws_url),
+            'srcset': self.build_srcset(self.renditions),
             'caption': self.caption,
             'description': self.description,
             'comments': [comment.to_dict_no_photo() for comment in self.comments],
-            'num_replies': sum([len(comment.replies) for comment in self.comments]),
+            'num_comments': self.comment_count,
+            'num_replies': self.reply_count,
             'albums' : [album.to_dict_no_pics_no_author() for album in self.photo_albums],
+            'status': self.status,
             'created_at': self.created_at
         }
 
     def to_dict_no_author(self):
         return {
             'id': self.id,
-            'url': self.aws_url,
-            'authorId': self.author.id,
+            'url': storage.url(self.aws_url),
+            'srcset': self.build_srcset(self.renditions),
+            'authorId': self.author_id,
             'caption': self.caption,
             'description': self.description,
+            'status': self.status,
             'created_at': self.created_at
         }
+
+
+# Full-text search index, for databases built with create_all
+# (the migration makes the same): a GIN index over search_vector on
+# Postgres, an FTS5 table keyed by photo id on SQLite
+event.listen(
+    Photo.__table__,
+    "after_create",
+    DDL("CREATE INDEX ix_photos_search_vector ON %(fullname)s USING gin (search_vector)")
+        .execute_if(dialect="postgresql")
+)
+event.listen(
+    Photo.__table__,
+    "after_create",
+    DDL("CREATE VIRTUAL TABLE photo_search USING fts5(caption, description, comments, tokenize='porter unicode61')")
+        .execute_if(dialect="sqlite")
+)
+event.listen(
+    Photo.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS photo_search").execute_if(dialect="sqlite")
+)
@@ -0,0 +1,17 @@
+from .db import db, environment, SCHEMA
+
+
+class ResponseVersion(db.Model):
+    """
+    Version stamp of a cached list response (a user's photo stream,
+    the album list) that no single row stands for, by cache key.
+    Bumped in the same transaction as each write it covers
+    (see cache_helpers); a key without a row is at version 0
+    """
+    __tablename__ = 'response_versions'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
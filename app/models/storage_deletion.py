@@ -0,0 +1,21 @@
+from .db import db, environment, SCHEMA
+from datetime import datetime
+
+
+class StorageDeletion(db.Model):
+    """
+    Outbox of storage objects to remove, one row per key.
+    Written in the same transaction as the change that orphaned the
+    object and drained by a background worker (see deletion_helpers)
+    """
+    __tablename__ = 'storage_deletions'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)
+    last_error = db.Column(db.String)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
@@ -0,0 +1,22 @@
+from .db import db, environment, SCHEMA
+from datetime import datetime
+
+
+class UploadClaim(db.Model):
+    """
+    One presigned direct upload, by storage key. Presigning inserts it;
+    finalizing sets claimed_at in the same transaction that hands the
+    file to a photo or user, so a replayed token can't give the same
+    file a second owner. `flask repair uploads` drops the rows whose
+    tokens have expired, and removes the files never finalized
+    """
+    __tablename__ = 'upload_claims'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    claimed_at = db.Column(db.DateTime)
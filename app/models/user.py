@@ -1,6 +1,18 @@
+from flask import current_app
 from .db import db, environment, SCHEMA, add_prefix_for_prod
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
 from flask_login import UserMixin
+from app.storage import storage
+
+
+def stored_hash_method(method):
+    """
+    The method prefix werkzeug stores for hashes made with method:
+    pbkdf2 always carries its cost, werkzeug's default if none is given
+    """
+    if method.startswith('pbkdf2:') and method.count(':') == 1:
+        return f'{method}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
 
 
 class User(db.Model, UserMixin):
@@ -18,6 +30,9 @@ class User(db.Model, UserMixin):
     username = db.Column(db.String(40), nullable=False, unique=True)
     email = db.Column(db.String(255), nullable=False, unique=True)
     hashed_password = db.Column(db.String(255), nullable=False)
+    # Bumped with every write that changes the user's profile response
+    # (see cache_helpers); GET /api/users/<id> answers If-None-Match from it
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     photos = db.relationship(
         "Photo",
@@ -45,24 +60,19 @@ class User(db.Model, UserMixin):
 
     @password.setter
     def password(self, password):
-        self.hashed_password = generate_password_hash(password)
+        self.hashed_password = generate_password_hash(password, current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         return check_password_hash(self.password, password)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'bio': self.bio,
-            'profile_picture_url': self.profile_image_url,
-            'cover_photo_url': self.cover_photo_url
-        }
+    def password_needs_rehash(self):
+        """
+        True if the stored hash was made with another method or cost
+        than PASSWORD_HASH_METHOD; rehash after a successful check
+        """
+        return self.hashed_password.split('$', 1)[0] != stored_hash_method(current_app.config['PASSWORD_HASH_METHOD'])
 
-    def to_dict_with_pics(self):
+    def to_dict(self):
         return {
             'id': self.id,
             'username': self.username,
@@ -70,8 +80,6 @@ class User(db.Model, UserMixin):
             'first_name': self.first_name,
             'last_name': self.last_name,
             'bio': self.bio,
-            'profile_picture_url': self.profile_image_url,
-            'cover_photo_url': self.cover_photo_url,
-            'photos': [photo.to_dict_no_author() for photo in self.photos],
-            'albums': [album.to_dict() for album in self.albums]
+            'profile_picture_url': storage.url(self.profile_image_url),
+            'cover_photo_url': storage.url(self.cover_photo_url)
         }
@@ -0,0 +1,46 @@
+import click
+from flask.cli import AppGroup
+from .explain import explain_endpoints
+from .budgets import check_budgets
+
+# Creates a perf group to hold our performance checks
+# So we can type `flask perf --help`
+perf_commands = AppGroup('perf')
+
+
+# Creates the `flask perf explain` command
+@perf_commands.command('explain')
+@click.option('--min-rows', default=1000, show_default=True,
+              help='Ignore sequential scans of tables smaller than this.')
+@click.option('--verbose', is_flag=True, help='Print every query plan.')
+def explain(min_rows, verbose):
+    """
+    EXPLAINs the queries behind each GET endpoint and fails if any
+    scans a large table sequentially. Run against a large seeded dataset
+    """
+    failures = explain_endpoints(min_rows, verbose)
+    if failures:
+        click.echo(f'\n{len(failures)} queries scan large tables sequentially:')
+        for url, statement, tables in failures:
+            click.echo(f"  {url}: {', '.join(sorted(tables))}")
+            click.echo(f"    {' '.join(statement.split())[:200]}")
+        raise SystemExit(1)
+    click.echo('\nNo sequential scans of large tables.')
+
+
+# Creates the `flask perf budgets` command
+@perf_commands.command('budgets')
+@click.option('--verbose', is_flag=True, help='Print the statements of every request.')
+def budgets(verbose):
+    """
+    Runs the requests in budgets.BUDGETS against a fixed throwaway
+    dataset and fails if any runs more SQL statements than its budget,
+    printing the statements it ran, most repeated first
+    """
+    failures = check_budgets(verbose)
+    if failures:
+        click.echo(f'\n{len(failures)} requests over their query budget or failing:')
+        for endpoint, url, status, count, budget, shapes in failures:
+            click.echo(f'  {endpoint} {url} [{status}]: {count} statements, budget {budget}')
+        raise SystemExit(1)
+    click.echo('\nEvery request is within its query budget.')
@@ -0,0 +1,141 @@
+import os
+import tempfile
+from collections import Counter
+import click
+from sqlalchemy import event, func
+from app.config import Config
+from app.models import db, User, Photo, Comment, Reply
+from app.instrumentation import statement_shape
+
+
+# Most SQL statements each request may run, as
+# (endpoint, method, url, form data, budget). The loaders keep these
+# fixed however many rows come back, so a budget only goes up when a
+# change adds a query on purpose; a lazy load per row blows through it.
+# A ?response=delta budget stays below its full response's: the delta
+# only reads the photo's row, never renders the photo.
+# url is filled in with the ids from budget_targets()
+BUDGETS = [
+    ('auth.authenticate', 'GET', '/api/auth/', None, 1),
+    ('auth.login', 'POST', '/api/auth/login', {'email': '{email}', 'password': 'password'}, 1),
+    ('photos.all_photos', 'GET', '/api/photos/all', None, 6),
+    ('photos.get_photo_by_id', 'GET', '/api/photos/{photo_id}', None, 6),
+    ('photos.get_all_albums', 'GET', '/api/photos/albums/all', None, 4),
+    ('users.user', 'GET', '/api/users/{user_id}', None, 7),
+    ('users.user_photos', 'GET', '/api/users/{user_id}/photos?limit=5', None, 2),
+    ('users.user_albums', 'GET', '/api/users/{user_id}/albums?limit=2', None, 4),
+    ('photos.create_comment', 'POST', '/api/photos/{photo_id}/comments/new', {'content': 'budget'}, 11),
+    ('photos.create_comment', 'POST', '/api/photos/{photo_id}/comments/new?response=delta', {'content': 'budget'}, 8),
+    ('photos.update_comment', 'PUT', '/api/photos/comments/{comment_id}/edit', {'content': 'budget'}, 13),
+    ('photos.update_comment', 'PUT', '/api/photos/comments/{comment_id}/edit?response=delta', {'content': 'budget'}, 8),
+    ('photos.reply_to_comment', 'POST', '/api/photos/comments/{comment_id}/new', {'content': 'budget'}, 11),
+    ('photos.reply_to_comment', 'POST', '/api/photos/comments/{comment_id}/new?response=delta', {'content': 'budget'}, 10),
+    ('photos.edit_reply', 'PUT', '/api/photos/comments/replies/{reply_id}/edit', {'content': 'budget'}, 13),
+    ('photos.edit_reply', 'PUT', '/api/photos/comments/replies/{reply_id}/edit?response=delta', {'content': 'budget'}, 9),
+    ('photos.delete_reply', 'DELETE', '/api/photos/comments/replies/{reply_id}/delete', None, 11),
+    ('photos.delete_reply', 'DELETE', '/api/photos/comments/replies/{other_reply_id}/delete?response=delta', None, 8),
+    ('photos.delete_comment', 'DELETE', '/api/photos/{photo_id}/comments/{comment_id}/delete', None, 14),
+    ('photos.delete_comment', 'DELETE', '/api/photos/{photo_id}/comments/{other_comment_id}/delete?response=delta', None, 10),
+]
+
+# The fixed dataset: big enough that a per-row query shows up as
+# dozens of statements, small enough to build in a second or two
+DATASET = {'users': 20, 'photos': 200, 'comments': 2000, 'replies': 500, 'albums': 50}
+
+
+def budget_app(workdir):
+    """
+    An app on a throwaway SQLite database seeded with DATASET, with
+    the response and snapshot caches off so every request does its
+    full work
+    """
+    from app import create_app
+    from app.seeds.scale import seed_scale
+
+    class BudgetConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'budgets.db')}"
+        SQLALCHEMY_ECHO = False
+        CACHE_BACKEND = 'none'
+        STORAGE_BACKEND = 'local'
+        STORAGE_ROOT = os.path.join(workdir, 'storage')
+        PERF_INSTRUMENTATION = False
+
+    app = create_app(BudgetConfig)
+    with app.app_context():
+        db.create_all()
+        seed_scale(**DATASET)
+    return app
+
+
+def budget_targets():
+    """
+    The rows the requests hit: the most commented photo, the user with
+    the most photos, and comments and replies on that photo
+    """
+    photo_id = db.session.query(Comment.photo_id) \
+        .group_by(Comment.photo_id).order_by(func.count().desc()).limit(1).scalar()
+    user_id = db.session.query(Photo.author_id) \
+        .group_by(Photo.author_id).order_by(func.count().desc()).limit(1).scalar()
+    comment_id, other_comment_id = [id for id, in db.session.query(Comment.id)
+                                    .filter(Comment.photo_id == photo_id).order_by(Comment.id).limit(2)]
+    reply_id, other_reply_id = [id for id, in db.session.query(Reply.id)
+                                .join(Comment, Reply.parent_id == Comment.id)
+                                .order_by(Comment.photo_id != photo_id, Reply.id).limit(2)]
+    return {
+        'photo_id': photo_id,
+        'user_id': user_id,
+        'email': db.session.get(User, user_id).email,
+        'comment_id': comment_id,
+        'other_comment_id': other_comment_id,
+        'reply_id': reply_id,
+        'other_reply_id': other_reply_id,
+    }
+
+
+def check_budgets(verbose=False):
+    """
+    Runs every request in BUDGETS as the heaviest user against the
+    fixed dataset, echoing a line per request, and returns a list of (endpoint, url, status, count,
+    budget, shapes) for those over budget or failing, shapes being
+    (count, statement) most repeated first
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        app = budget_app(workdir)
+        with app.app_context():
+            engine = db.engine
+            targets = budget_targets()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(targets['user_id'])
+            session['_fresh'] = True
+        client.get('/api/auth/')
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement_shape(statement))
+
+        failures = []
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            for endpoint, method, url, data, budget in BUDGETS:
+                url = url.format(**targets)
+                if data:
+                    data = {name: value.format(**targets) for name, value in data.items()}
+                statements.clear()
+                response = client.open(url, method=method, data=data)
+                shapes = [(count, shape) for shape, count in Counter(statements).most_common()]
+                over = len(statements) > budget or response.status_code >= 400
+                click.echo(f"{'FAIL' if over else 'ok':4}  {method:6} {url:<60} "
+                      f"[{response.status_code}] {len(statements):3} / {budget}")
+                if over:
+                    failures.append((endpoint, url, response.status_code, len(statements), budget, shapes))
+                if verbose or over:
+                    for count, shape in shapes:
+                        click.echo(f"        {count:3}x {' '.join(shape.split())[:160]}")
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+            engine.dispose()
+
+    return failures
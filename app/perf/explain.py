@@ -0,0 +1,152 @@
+import json
+import click
+from flask import current_app
+from sqlalchemy import event, func
+from app.models import db, User, Photo, Comment, Album
+from app.cache import NullBackend
+
+
+# Tables an endpoint reads in full by design, by endpoint name;
+# a scan of these is expected
+FULL_SCANS = {
+    'users.users': {'users'},
+    'photos.get_all_albums': {'albums', 'album_photos', 'photos'},
+}
+
+
+def sample_urls():
+    """
+    The GET endpoints to check, pointed at the heaviest rows in the
+    dataset: the most commented photo, the most prolific user
+    """
+    photo_id = db.session.query(Comment.photo_id) \
+        .group_by(Comment.photo_id).order_by(func.count().desc()).limit(1).scalar() \
+        or db.session.query(func.min(Photo.id)).scalar()
+    user_id = db.session.query(Photo.author_id) \
+        .group_by(Photo.author_id).order_by(func.count().desc()).limit(1).scalar() \
+        or db.session.query(func.min(User.id)).scalar()
+    album_user_id = db.session.query(Album.author_id) \
+        .group_by(Album.author_id).order_by(func.count().desc()).limit(1).scalar() \
+        or user_id
+
+    return user_id, [
+        '/api/auth/',
+        '/api/users/',
+        '/api/photos/all',
+        '/api/photos/all?cursor={next_cursor}',
+        f'/api/photos/{photo_id}',
+        f'/api/photos/user/{user_id}',
+        '/api/photos/albums/all',
+        f'/api/users/{user_id}',
+        f'/api/users/{album_user_id}',
+    ]
+
+
+def capture_statements(client, url):
+    """
+    Requests url through the test client and returns the response
+    and every (statement, parameters) pair it executed
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, statements
+
+
+def _walk_postgres(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _walk_postgres(child)
+
+
+def sequential_scans(conn, statement, parameters):
+    """
+    EXPLAINs one statement and returns the tables it scans
+    sequentially, with the plan lines for reporting
+    """
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        raw = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        plan = (raw if isinstance(raw, list) else json.loads(raw))[0]['Plan']
+        nodes = list(_walk_postgres(plan))
+        tables = {node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan'}
+        lines = [f"{node['Node Type']} {node.get('Relation Name', '')}".strip() for node in nodes]
+    elif dialect == 'sqlite':
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        lines = [row[-1] for row in rows]
+        # "SCAN photos" is a table scan; "SCAN photos USING INDEX ..." walks
+        # an index in order (e.g. ORDER BY ... LIMIT) and is fine
+        tables = {line.split()[1] for line in lines
+                  if line.startswith('SCAN ') and ' USING ' not in line}
+    else:
+        raise RuntimeError(f'EXPLAIN check does not support {dialect}')
+    return tables, lines
+
+
+def table_rows(conn, table):
+    return conn.execute(db.select(func.count()).select_from(db.table(table))).scalar()
+
+
+def explain_endpoints(min_rows, verbose=False):
+    """
+    Drives every checked GET endpoint as its heaviest user, EXPLAINs
+    each SELECT it issues and returns a list of
+    (url, statement, tables) for the sequential scans found.
+    Tables under min_rows are ignored: planners rightly scan tiny tables
+    """
+    app = current_app._get_current_object()
+    user_id, urls = sample_urls()
+
+    # Render from the database, not the response cache
+    backend, app.extensions["response_cache"] = app.extensions["response_cache"], NullBackend()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    urls_map = app.url_map.bind('localhost')
+    failures = []
+    sizes = {}
+    next_cursor = None
+    try:
+        with db.engine.connect() as conn:
+            if conn.dialect.name in ('postgresql', 'sqlite'):
+                conn.exec_driver_sql('ANALYZE')
+
+            for url in urls:
+                if '{next_cursor}' in url:
+                    if not next_cursor:
+                        continue
+                    url = url.format(next_cursor=next_cursor)
+
+                response, statements = capture_statements(client, url)
+                if url == '/api/photos/all':
+                    next_cursor = response.get_json().get('next_cursor')
+                click.echo(f'{url}  [{response.status_code}, {len(statements)} queries]')
+                expected = FULL_SCANS.get(urls_map.match(url.split('?')[0])[0], set())
+
+                for statement, parameters in statements:
+                    tables, lines = sequential_scans(conn, statement, parameters)
+                    for table in tables:
+                        sizes.setdefault(table, table_rows(conn, table))
+                    bad = {table for table in tables
+                           if sizes[table] >= min_rows
+                           and table not in expected}
+                    if bad:
+                        failures.append((url, statement, bad))
+                    if verbose or bad:
+                        click.echo('    ' + ' '.join(statement.split())[:160])
+                        for line in lines:
+                            click.echo('      ' + line)
+    finally:
+        app.extensions["response_cache"] = backend
+
+    return failures
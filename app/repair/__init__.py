@@ -0,0 +1,69 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func
+from app.models import db, Photo, Album
+from app.api.counter_helpers import recount_photos
+from app.api.album_helpers import recount_albums
+from app.api.cache_helpers import album_keys, bump_versions
+from app.api.upload_helpers import expire_upload_claims, fail_stale_uploads
+
+# Creates a repair group to hold our data fixes
+# So we can type `flask repair --help`
+repair_commands = AppGroup('repair')
+
+
+def id_ranges(model, size):
+    """
+    (first, last) id pairs covering every row of model, size ids apart
+    """
+    first, last = db.session.query(func.min(model.id), func.max(model.id)).one()
+    if first is None:
+        return
+    for start in range(first, last + 1, size):
+        yield start, start + size - 1
+
+
+# Creates the `flask repair counts` command
+@repair_commands.command('counts')
+@click.option('--batch-size', default=10000, show_default=True,
+              help='Rows recounted per transaction.')
+def counts(batch_size):
+    """
+    Recomputes the counters kept on the rows (each photo's
+    comment_count and reply_count, each album's photo_count and cover)
+    from the tables they count, for after rows were written with plain
+    SQL or the counts drifted, and bumps the versions of the cached
+    responses showing them. Commits every batch_size ids so no
+    long-running transaction holds the tables
+    """
+    fixed = 0
+    for first, last in id_ranges(Photo, batch_size):
+        fixed += recount_photos(Photo.id.between(first, last))
+        db.session.commit()
+    click.echo(f"Fixed the comment and reply counts of {fixed} photos")
+
+    for first, last in id_ranges(Album, batch_size):
+        recount_albums(Album.id.between(first, last))
+        bump_versions(album_keys([id for id, in db.session.query(Album.id)
+                                  .filter(Album.id.between(first, last))]))
+        db.session.commit()
+    click.echo(f"Recounted {Album.query.count()} albums")
+
+
+# Creates the `flask repair uploads` command
+@repair_commands.command('uploads')
+def uploads():
+    """
+    Cleans up after uploads that never finished: marks failed the
+    photos whose upload worker died (see UPLOAD_STALE_AFTER), and
+    removes the files of presigned direct uploads whose tokens expired
+    before they were finalized. Safe to run at any time, e.g. every
+    few minutes from cron
+    """
+    failed = fail_stale_uploads()
+    db.session.commit()
+    click.echo(f"Marked {failed} stalled photo uploads failed")
+
+    expired = expire_upload_claims()
+    db.session.commit()
+    click.echo(f"Queued {expired} unfinalized direct uploads for removal")
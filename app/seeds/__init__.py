@@ -1,11 +1,14 @@
+import click
 from flask.cli import AppGroup
 from .users import seed_users, undo_users
 from .photos import seed_photos, undo_photos
 from .albums import seed_albums, undo_albums
 from .comments import seed_comments, undo_comments
 from .replies import seed_replies, undo_replies
+from .scale import seed_scale
 
 from app.models.db import db, environment, SCHEMA
+from app.api.search_helpers import rebuild_index
 
 # Creates a seed group to hold our commands
 # So we can type `flask seed --help`
@@ -32,6 +35,37 @@ def seed():
     seed_replies(all_comments, all_users)
 
 
+# Creates the `flask seed scale` command
+@seed_commands.command('scale')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--photos', default=20000, show_default=True)
+@click.option('--comments', default=200000, show_default=True)
+@click.option('--replies', default=None, type=int, help='Defaults to a quarter of --comments.')
+@click.option('--albums', default=None, type=int, help='Defaults to a quarter of --photos.')
+@click.option('--seed', default=0, show_default=True, help='Random seed; the same seed gives the same data.')
+def scale(users, photos, comments, replies, albums, seed):
+    """
+    Adds a large synthetic dataset on top of the current data, for
+    reproducing production-scale load locally (flask perf explain,
+    benchmarks/bench_endpoints.py). Popularity is skewed: a few users
+    post most photos and own hundreds of albums, a few photos draw
+    thousands of comments. Rows are bulk loaded (COPY on Postgres)
+    """
+    counts = seed_scale(
+        users, photos, comments,
+        comments // 4 if replies is None else replies,
+        photos // 4 if albums is None else albums,
+        seed
+    )
+    click.echo(
+        f"Added {counts['users']} users, {counts['photos']} photos, {counts['albums']} albums, "
+        f"{counts['comments']} comments, {counts['replies']} replies"
+    )
+    click.echo(f"  user {counts['top_poster'][0]} posted {counts['top_poster'][1]} photos")
+    click.echo(f"  user {counts['top_album_owner'][0]} owns {counts['top_album_owner'][1]} albums")
+    click.echo(f"  photo {counts['hottest_photo'][0]} has {counts['hottest_photo'][1]} comments")
+
+
 # Creates the `flask seed undo` command
 @seed_commands.command('undo')
 def undo():
@@ -41,3 +75,7 @@ def undo():
     undo_photos()
     undo_users()
     # Add other undo functions here
+
+    # The undo functions delete with plain SQL, which the search index doesn't see
+    rebuild_index()
+    db.session.commit()
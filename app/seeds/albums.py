@@ -1,4 +1,5 @@
 from app.models import db, Album, environment, SCHEMA
+from app.api.album_helpers import recount_albums
 from sqlalchemy.sql import text
 from random import choice
 
@@ -40,6 +41,9 @@ def seed_albums(all_pics):
     all_albums = [space, sunsets, clouds, moon]
 
     add = [db.session.add(album) for album in all_albums]
+    db.session.flush()
+    # Photo counts and covers (the first photo) from the photos above
+    recount_albums()
     db.session.commit()
 
 def undo_albums():
@@ -1,4 +1,5 @@
 from app.models import db, Reply, environment, SCHEMA
+from app.api.counter_helpers import recount_photos
 from sqlalchemy.sql import text
 from random import choice
 
@@ -32,7 +33,9 @@ def seed_replies(comments, users):
         for comment in generic_comments]
 
     added = [db.session.add(reply) for reply in all_replies]
-
+    db.session.flush()
+    # Comment and reply counts for every photo, from the comments and replies above
+    recount_photos()
     db.session.commit()
 
 
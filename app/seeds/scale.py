@@ -0,0 +1,211 @@
+import csv
+import io
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from flask import current_app
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+from faker import Faker
+from app.models import db, User, Photo, Album, Comment, Reply, album_photos
+from app.api.search_helpers import index_photos
+from app.api.album_helpers import recount_albums
+from app.api.counter_helpers import recount_photos
+
+# Rows per INSERT (or COPY) round trip
+BATCH_SIZE = 5000
+
+# Zipf exponent for every "who/what gets picked" choice: a handful of
+# users post most photos and own most albums, a handful of photos
+# draw most comments, as on the real site
+SKEW = 1.1
+
+# Used when the database has no seeded photos to borrow files from
+FALLBACK_URLS = [
+    'https://highrme-pics.s3.us-east-2.amazonaws.com/sunset_seed_1.webp',
+    'https://highrme-pics.s3.us-east-2.amazonaws.com/sunset_seed_2.png',
+    'https://highrme-pics.s3.us-east-2.amazonaws.com/sunset4.jpg',
+]
+
+
+def zipf_picker(rng, population):
+    """
+    A function returning k items of population, drawn with Zipf
+    weights over a shuffled order, so the popular items are spread
+    across the id range rather than being the first ids
+    """
+    population = list(population)
+    rng.shuffle(population)
+    cum_weights = list(accumulate(1 / (rank + 1) ** SKEW for rank in range(len(population))))
+    return lambda k: rng.choices(population, cum_weights=cum_weights, k=k)
+
+
+def batched(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def bulk_load(table, rows):
+    """
+    Loads an iterable of row dicts into table in batches:
+    COPY on Postgres (psycopg2), a multi-row INSERT elsewhere.
+    Bypasses the ORM, so no session events run
+    """
+    connection = db.session.connection()
+    use_copy = connection.dialect.driver == 'psycopg2'
+    total = 0
+    for batch in batched(rows):
+        if use_copy:
+            columns = list(batch[0])
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows([row[column] for column in columns] for row in batch)
+            buffer.seek(0)
+            cursor = connection.connection.cursor()
+            cursor.copy_expert(
+                f"COPY {table.fullname} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        else:
+            connection.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+
+def next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def reset_sequence(model):
+    # Rows were loaded with explicit ids; move the id sequence past them
+    if db.session.get_bind().dialect.name == 'postgresql':
+        table = model.__table__.fullname
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+        ))
+
+
+def seed_scale(users, photos, comments, replies, albums, seed=0):
+    """
+    Adds a synthetic dataset of the given size to whatever is already
+    in the database, with skewed popularity (see SKEW).
+    Every user's password is "password".
+    Returns the row counts and the heaviest user, photo and album owner
+    """
+    rng = random.Random(seed)
+    fake = Faker()
+    Faker.seed(seed)
+    now = datetime.now()
+
+    # Text is drawn from small pools: Faker is too slow to call per row
+    first_names = [fake.first_name() for _ in range(200)]
+    last_names = [fake.last_name() for _ in range(200)]
+    sentences = [fake.sentence(nb_words=8) for _ in range(500)]
+    titles = [fake.sentence(nb_words=3).rstrip('.') for _ in range(200)]
+    urls = [url for url, in db.session.query(Photo.aws_url).filter(Photo.aws_url.contains('://')).distinct().limit(100)] \
+        or FALLBACK_URLS
+    hashed_password = generate_password_hash('password', method=current_app.config['PASSWORD_HASH_METHOD'])
+
+    first_user = next_id(User)
+    user_ids = range(first_user, first_user + users)
+    bulk_load(User.__table__, ({
+        'id': id,
+        'first_name': rng.choice(first_names),
+        'last_name': rng.choice(last_names),
+        'bio': rng.choice(sentences),
+        'username': f'{rng.choice(first_names).lower()}{id}',
+        'email': f'user{id}@scale.io',
+        'hashed_password': hashed_password,
+        'profile_image_url': User.__table__.c.profile_image_url.default.arg,
+        'cover_photo_url': User.__table__.c.cover_photo_url.default.arg,
+    } for id in user_ids))
+
+    first_photo = next_id(Photo)
+    photo_ids = range(first_photo, first_photo + photos)
+    # The same few users post the most, own the most albums and comment the most
+    pick_users = zipf_picker(rng, user_ids)
+    photo_authors = pick_users(photos)
+    bulk_load(Photo.__table__, ({
+        'id': id,
+        'author_id': author_id,
+        'aws_url': rng.choice(urls),
+        'caption': rng.choice(titles),
+        'description': rng.choice(sentences),
+        'created_at': now - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)),
+        'status': 'ready',
+    } for id, author_id in zip(photo_ids, photo_authors)))
+
+    photos_by_user = {}
+    for photo_id, author_id in zip(photo_ids, photo_authors):
+        photos_by_user.setdefault(author_id, []).append(photo_id)
+
+    # Albums hold a few of their author's own photos (any photos, for
+    # authors with none); a few hold dozens
+    first_album = next_id(Album)
+    album_ids = range(first_album, first_album + albums)
+    album_authors = pick_users(albums)
+    members = {}
+    for album_id, author_id in zip(album_ids, album_authors):
+        pool = photos_by_user.get(author_id) or photo_ids
+        size = min(len(pool), int(rng.paretovariate(1.5)) + 1)
+        members[album_id] = rng.sample(pool, size) if pool else []
+    bulk_load(Album.__table__, ({
+        'id': id,
+        'author_id': author_id,
+        'title': rng.choice(titles),
+        'description': rng.choice(sentences),
+        'created_at': (now - timedelta(days=rng.randrange(2 * 365))).date(),
+    } for id, author_id in zip(album_ids, album_authors)))
+    bulk_load(album_photos, (
+        {'album_id': album_id, 'photo_id': photo_id}
+        for album_id, photo_ids_in_album in members.items()
+        for photo_id in photo_ids_in_album
+    ))
+    recount_albums(Album.id >= first_album)
+
+    first_comment = next_id(Comment)
+    comment_ids = range(first_comment, first_comment + comments)
+    comment_photos = zipf_picker(rng, photo_ids)(comments) if photos else []
+    comment_authors = pick_users(comments)
+    bulk_load(Comment.__table__, ({
+        'id': id,
+        'author_id': author_id,
+        'photo_id': photo_id,
+        'content': rng.choice(sentences),
+        'created_at': (now - timedelta(days=rng.randrange(365))).date(),
+    } for id, photo_id, author_id in zip(comment_ids, comment_photos, comment_authors)))
+
+    first_reply = next_id(Reply)
+    reply_parents = zipf_picker(rng, comment_ids)(replies) if comments else []
+    reply_authors = pick_users(len(reply_parents))
+    bulk_load(Reply.__table__, ({
+        'id': first_reply + i,
+        'author_id': author_id,
+        'parent_id': parent_id,
+        'content': rng.choice(sentences),
+        'created_at': (now - timedelta(days=rng.randrange(365))).date(),
+    } for i, (parent_id, author_id) in enumerate(zip(reply_parents, reply_authors))))
+
+    # New comments only land on new photos
+    recount_photos(Photo.id >= first_photo)
+    for model in (User, Photo, Album, Comment, Reply):
+        reset_sequence(model)
+    for batch in batched(photo_ids):
+        index_photos(batch)
+    db.session.commit()
+
+    def heaviest(ids):
+        return (Counter(ids).most_common(1) or [(None, 0)])[0]
+
+    return {
+        'users': users,
+        'photos': photos,
+        'albums': albums,
+        'comments': comments,
+        'replies': len(reply_parents),
+        'top_poster': heaviest(photo_authors),
+        'top_album_owner': heaviest(album_authors),
+        'hottest_photo': heaviest(comment_photos),
+    }
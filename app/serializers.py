@@ -0,0 +1,186 @@
+from app.models import db, User, Photo, Comment, Reply, Album, album_photos
+from app.storage import storage
+
+
+# Row serializers for the read-heavy endpoints.
+# They select plain column tuples and build the same dictionaries as the
+# model to_dict methods, without constructing ORM instances or walking
+# relationships; each shape costs a fixed number of queries.
+
+
+class FieldMap:
+    """
+    A precompiled (output key, column[, convert]) list.
+    columns goes straight into a query; build turns the matching
+    slice of a result row into a dict, passing a value through
+    convert where the field has one
+    """
+
+    def __init__(self, *fields):
+        self.keys = tuple(field[0] for field in fields)
+        self.columns = tuple(field[1] for field in fields)
+        self.converters = tuple((key, field[2]) for key, field in zip(self.keys, fields) if len(field) > 2)
+        self.width = len(fields)
+
+    def build(self, row, offset=0):
+        obj = dict(zip(self.keys, row[offset:offset + self.width]))
+        for key, convert in self.converters:
+            obj[key] = convert(obj[key])
+        return obj
+
+
+# User.to_dict
+USER = FieldMap(
+    ('id', User.id),
+    ('username', User.username),
+    ('email', User.email),
+    ('first_name', User.first_name),
+    ('last_name', User.last_name),
+    ('bio', User.bio),
+    ('profile_picture_url', User.profile_image_url, storage.url),
+    ('cover_photo_url', User.cover_photo_url, storage.url),
+)
+
+# Photo.to_dict, minus the nested author/comments/albums
+PHOTO = FieldMap(
+    ('id', Photo.id),
+    ('url', Photo.aws_url, storage.url),
+    ('srcset', Photo.renditions, Photo.build_srcset),
+    ('caption', Photo.caption),
+    ('description', Photo.description),
+    ('num_comments', Photo.comment_count),
+    ('num_replies', Photo.reply_count),
+    ('status', Photo.status),
+    ('created_at', Photo.created_at),
+)
+
+# Photo.to_dict_no_author
+PHOTO_NO_AUTHOR = FieldMap(
+    ('id', Photo.id),
+    ('url', Photo.aws_url, storage.url),
+    ('srcset', Photo.renditions, Photo.build_srcset),
+    ('authorId', Photo.author_id),
+    ('caption', Photo.caption),
+    ('description', Photo.description),
+    ('status', Photo.status),
+    ('created_at', Photo.created_at),
+)
+
+# Comment.to_dict_no_photo, minus author/replies
+COMMENT = FieldMap(
+    ('id', Comment.id),
+    ('content', Comment.content),
+    ('created_at', Comment.created_at),
+)
+
+# Reply.to_dict, minus author
+REPLY = FieldMap(
+    ('id', Reply.id),
+    ('content', Reply.content),
+    ('created_at', Reply.created_at),
+)
+
+# Album.to_dict_no_pics_no_author
+ALBUM_SUMMARY = FieldMap(
+    ('id', Album.id),
+    ('title', Album.title),
+    ('description', Album.description),
+    ('cover_photo', Album.cover_photo_url, storage.url),
+    ('created_at', Album.created_at),
+    ('length', Album.photo_count),
+)
+
+# Album.to_dict, minus author/pics
+ALBUM = FieldMap(
+    ('id', Album.id),
+    ('title', Album.title),
+    ('description', Album.description),
+    ('cover_photo', Album.cover_photo_url, storage.url),
+    ('created_at', Album.created_at),
+)
+
+
+def serialize_photos(photo_ids):
+    """
+    Returns Photo.to_dict() for each id, in the order given,
+    using one query per nesting level
+    """
+    if not photo_ids:
+        return []
+
+    photos = {}
+    rows = db.session.query(*PHOTO.columns, *USER.columns) \
+        .join(User, Photo.author_id == User.id) \
+        .filter(Photo.id.in_(photo_ids))
+    for row in rows:
+        photo = PHOTO.build(row)
+        photo['author'] = USER.build(row, PHOTO.width)
+        photo['comments'] = []
+        photo['albums'] = []
+        photos[photo['id']] = photo
+
+    comments = {}
+    rows = db.session.query(Comment.photo_id, *COMMENT.columns, *USER.columns) \
+        .join(User, Comment.author_id == User.id) \
+        .filter(Comment.photo_id.in_(photo_ids)) \
+        .order_by(Comment.id)
+    for row in rows:
+        comment = COMMENT.build(row, 1)
+        comment['author'] = USER.build(row, 1 + COMMENT.width)
+        comment['replies'] = []
+        comments[comment['id']] = comment
+        photos[row[0]]['comments'].append(comment)
+
+    rows = db.session.query(Comment.photo_id, Reply.parent_id, *REPLY.columns, *USER.columns) \
+        .join(Comment, Reply.parent_id == Comment.id) \
+        .join(User, Reply.author_id == User.id) \
+        .filter(Comment.photo_id.in_(photo_ids)) \
+        .order_by(Reply.id)
+    for row in rows:
+        reply = REPLY.build(row, 2)
+        reply['author'] = USER.build(row, 2 + REPLY.width)
+        comments[row[1]]['replies'].append(reply)
+
+    rows = db.session.query(album_photos.c.photo_id, *ALBUM_SUMMARY.columns) \
+        .join(Album, Album.id == album_photos.c.album_id) \
+        .filter(album_photos.c.photo_id.in_(photo_ids)) \
+        .order_by(Album.id)
+    for row in rows:
+        photos[row[0]]['albums'].append(ALBUM_SUMMARY.build(row, 1))
+
+    return [photos[id] for id in photo_ids if id in photos]
+
+
+def serialize_photo(photo_id):
+    """
+    Returns Photo.to_dict() for one photo, or None if there is no such photo
+    """
+    photos = serialize_photos([photo_id])
+    return photos[0] if photos else None
+
+
+def serialize_albums(*criteria):
+    """
+    Returns Album.to_dict() for every album matching criteria
+    (all albums if none are given), in two queries
+    """
+    albums = {}
+    rows = db.session.query(*ALBUM.columns, *USER.columns) \
+        .join(User, Album.author_id == User.id) \
+        .filter(*criteria) \
+        .order_by(Album.id)
+    for row in rows:
+        album = ALBUM.build(row)
+        album['author'] = USER.build(row, ALBUM.width)
+        album['pics'] = []
+        albums[album['id']] = album
+
+    if albums:
+        rows = db.session.query(album_photos.c.album_id, *PHOTO_NO_AUTHOR.columns) \
+            .join(Photo, Photo.id == album_photos.c.photo_id) \
+            .filter(album_photos.c.album_id.in_(list(albums))) \
+            .order_by(Photo.id)
+        for row in rows:
+            albums[row[0]]['pics'].append(PHOTO_NO_AUTHOR.build(row, 1))
+
+    return list(albums.values())
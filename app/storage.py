@@ -0,0 +1,413 @@
+import itertools
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+from flask import current_app, send_file
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from werkzeug.security import safe_join
+from app.api.stream_helpers import UploadStream, sniff_image_type
+from app.instrumentation import timed
+
+
+# Stored files are never rewritten in place: every key is either
+# content-addressed (see blob_filename) or unique (get_unique_filename)
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class S3Storage:
+    """
+    Files in an S3 bucket (or an S3-compatible server at endpoint_url),
+    public at location + key. The boto3 client is created on first use
+    """
+
+    def __init__(self, bucket, key_id=None, secret=None, endpoint_url=None, acl="public-read"):
+        self.bucket = bucket
+        self.key_id = key_id
+        self.secret = secret
+        self.endpoint_url = endpoint_url
+        self.acl = acl
+        self.location = f"{endpoint_url.rstrip('/')}/{bucket}/" if endpoint_url \
+            else f"http://{bucket}.s3.amazonaws.com/"
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import boto3
+                self._client = boto3.client(
+                    "s3",
+                    aws_access_key_id=self.key_id,
+                    aws_secret_access_key=self.secret,
+                    endpoint_url=self.endpoint_url
+                )
+            return self._client
+
+    def url(self, key):
+        return f"{self.location}{key}"
+
+    def save(self, upload, key):
+        """
+        Sends an UploadStream's chunks in a single pass: a file that fits
+        in one chunk is PUT whole, anything larger goes up as a multipart
+        upload, one part per chunk. Aborts any partial upload on failure
+        """
+        chunks = upload.chunks()
+        multipart_id = None
+        try:
+            first = next(chunks)
+            second = next(chunks, None)
+
+            if second is None:
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=first,
+                    ACL=self.acl,
+                    ContentType=upload.content_type,
+                    CacheControl=IMMUTABLE
+                )
+            else:
+                multipart_id = self.client.create_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=key,
+                    ACL=self.acl,
+                    ContentType=upload.content_type,
+                    CacheControl=IMMUTABLE
+                )["UploadId"]
+                parts = []
+                for number, chunk in enumerate(itertools.chain([first, second], chunks), 1):
+                    part = self.client.upload_part(
+                        Bucket=self.bucket,
+                        Key=key,
+                        UploadId=multipart_id,
+                        PartNumber=number,
+                        Body=chunk
+                    )
+                    parts.append({"PartNumber": number, "ETag": part["ETag"]})
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=multipart_id,
+                    MultipartUpload={"Parts": parts}
+                )
+        except Exception:
+            if multipart_id is not None:
+                try:
+                    self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=multipart_id)
+                except Exception:
+                    pass
+            raise
+
+    def info(self, key):
+        import botocore
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except botocore.exceptions.ClientError:
+            return None
+        return {"size": head["ContentLength"], "content_type": head.get("ContentType")}
+
+    def read_head(self, key, length):
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes=0-{length - 1}")
+        return response["Body"].read()
+
+    def load_path(self, key, path):
+        self.client.download_file(self.bucket, key, path)
+
+    def presign_post(self, key, content_type, max_size, expires_in):
+        """
+        The policy pins the ACL and content type and caps the size,
+        so S3 rejects anything else
+        """
+        post = self.client.generate_presigned_post(
+            self.bucket,
+            key,
+            Fields={"acl": self.acl, "Content-Type": content_type},
+            Conditions=[
+                {"acl": self.acl},
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size]
+            ],
+            ExpiresIn=expires_in
+        )
+        return {"url": post["url"], "fields": post["fields"]}
+
+    def delete_many(self, keys):
+        try:
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+            )
+        except Exception as e:
+            return {key: str(e) for key in keys}
+
+        return {error["Key"]: error.get("Message", error.get("Code", ""))
+                for error in response.get("Errors", [])}
+
+    def send(self, key):
+        # Served by S3 itself
+        return None
+
+
+class LocalStorage:
+    """
+    Files in a directory on local disk, served by this app at
+    base_url + key (see storage_routes), for development, CI and
+    installs without S3.
+    With accel_prefix set the file is handed to nginx with
+    X-Accel-Redirect (an internal location mapped to root);
+    otherwise Flask sends it, or the server does with USE_X_SENDFILE.
+    Range requests are honoured either way
+    """
+
+    def __init__(self, root, base_url="/api/storage/files/", accel_prefix=None):
+        self.root = root
+        self.base_url = base_url
+        self.accel_prefix = accel_prefix
+        os.makedirs(root, exist_ok=True)
+
+    def url(self, key):
+        return f"{self.base_url}{key}"
+
+    def path(self, key):
+        """
+        The file for key, or None if key would leave root
+        """
+        return safe_join(self.root, key)
+
+    def save(self, upload, key):
+        """
+        Writes an UploadStream's chunks to a temporary file next to the
+        target and renames it into place, so readers never see half a file
+        """
+        path = self.path(key)
+        if path is None:
+            raise ValueError(f"Invalid storage key: {key}")
+        fd, partial = tempfile.mkstemp(dir=self.root, prefix=".partial-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in upload.chunks():
+                    file.write(chunk)
+            os.replace(partial, path)
+        except BaseException:
+            os.remove(partial)
+            raise
+
+    def info(self, key):
+        path = self.path(key)
+        if path is None or not os.path.isfile(path):
+            return None
+        with open(path, "rb") as file:
+            content_type = sniff_image_type(file.read(16))
+        return {"size": os.path.getsize(path), "content_type": content_type}
+
+    def read_head(self, key, length):
+        with open(self.path(key), "rb") as file:
+            return file.read(length)
+
+    def load_path(self, key, path):
+        shutil.copyfile(self.path(key), path)
+
+    def presign_post(self, key, content_type, max_size, expires_in):
+        """
+        Same shape as S3's: the browser POSTs the fields and the file
+        to url, here the local upload route, which enforces the signed policy
+        """
+        policy = local_upload_serializer().dumps({
+            "key": key,
+            "content_type": content_type,
+            "max_size": max_size,
+            "expires_in": expires_in
+        })
+        return {"url": "/api/storage/upload", "fields": {"key": key, "policy": policy}}
+
+    def delete_many(self, keys):
+        failed = {}
+        for key in keys:
+            path = self.path(key)
+            try:
+                if path is None:
+                    raise ValueError(f"Invalid storage key: {key}")
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                failed[key] = str(e)
+        return failed
+
+    def send(self, key):
+        """
+        A response streaming the file for key, or None if there is none
+        """
+        path = self.path(key)
+        if path is None or not os.path.isfile(path):
+            return None
+
+        if self.accel_prefix:
+            response = current_app.response_class(mimetype=mimetypes.guess_type(key)[0])
+            response.headers["X-Accel-Redirect"] = f"{self.accel_prefix.rstrip('/')}/{key}"
+        else:
+            response = send_file(path, conditional=True)
+        response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+
+def local_upload_serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="local-upload")
+
+
+def load_local_policy(policy):
+    """
+    The signed upload policy from LocalStorage.presign_post, or None
+    if it is forged or expired
+    """
+    serializer = local_upload_serializer()
+    try:
+        # Check the signature before trusting the expiry it carries
+        expires_in = serializer.loads(policy)["expires_in"]
+        return serializer.loads(policy, max_age=expires_in)
+    except BadSignature:
+        return None
+
+
+def make_storage(config, instance_path):
+    """
+    Builds the backend named by STORAGE_BACKEND:
+    s3 (S3_BUCKET, default when it is set) or local (STORAGE_ROOT)
+    """
+    kind = config.get("STORAGE_BACKEND") or ("s3" if config.get("S3_BUCKET") else "local")
+
+    if kind == "s3":
+        return S3Storage(
+            config["S3_BUCKET"],
+            config.get("S3_KEY"),
+            config.get("S3_SECRET"),
+            config.get("S3_ENDPOINT_URL")
+        )
+    if kind == "local":
+        return LocalStorage(
+            config.get("STORAGE_ROOT") or os.path.join(instance_path, "storage"),
+            config.get("STORAGE_URL", "/api/storage/files/"),
+            config.get("STORAGE_ACCEL_REDIRECT")
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {kind}")
+
+
+class Storage:
+    """
+    Stores uploaded files under keys through the configured backend.
+    Models keep the key and resolve it with url() when serialized, so
+    the same rows work on any backend. Rows from before keys were
+    stored hold absolute URLs, which url() passes through
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["storage"] = make_storage(app.config, app.instance_path)
+
+    @property
+    def backend(self):
+        # The current app's backend; apps never share one
+        return current_app.extensions["storage"]
+
+    def url(self, value):
+        """
+        The public URL of a stored key (or legacy URL), None for None
+        """
+        if not value or "://" in value:
+            return value
+        return self.backend.url(value)
+
+    @staticmethod
+    def key(value):
+        """
+        The key of a stored key or legacy URL; keys have no slashes
+        """
+        return value.rsplit("/", 1)[-1]
+
+    def save(self, stream, key, max_size=None):
+        """
+        Stores a file-like object under key, reading it once in bounded
+        chunks (see UploadStream). The content type is sniffed from the
+        bytes, not taken from the client.
+        Returns {"key", "sha256", "size", "content_type"} or {"errors"}
+        """
+        upload = UploadStream(
+            stream,
+            max_size or current_app.config["MAX_UPLOAD_SIZE"],
+            current_app.config["UPLOAD_CHUNK_SIZE"]
+        )
+        try:
+            with timed("storage"):
+                self.backend.save(upload, key)
+        except Exception as e:
+            return {"errors": str(e)}
+
+        return {
+            "key": key,
+            "sha256": upload.sha256,
+            "size": upload.size,
+            "content_type": upload.content_type
+        }
+
+    def save_path(self, path, key):
+        """
+        Stores a file already on local disk, for background workers
+        that no longer have the request's FileStorage
+        """
+        with open(path, "rb") as file:
+            return self.save(file, key)
+
+    def info(self, key):
+        """
+        Size and content type of a stored file, or None if there is none
+        """
+        with timed("storage"):
+            return self.backend.info(key)
+
+    def read_head(self, key, length):
+        """
+        The first length bytes of a stored file, for sniffing its type
+        """
+        with timed("storage"):
+            return self.backend.read_head(key, length)
+
+    def load_path(self, key, path):
+        """
+        Copies a stored file to path on local disk, for background
+        workers processing a file the browser uploaded straight to storage
+        """
+        with timed("storage"):
+            self.backend.load_path(key, path)
+
+    def presign_post(self, key, content_type, max_size, expires_in):
+        """
+        Credentials for a browser to POST one file straight to storage
+        under key: {"url", "fields"}, or {"errors"}
+        """
+        try:
+            with timed("storage"):
+                return self.backend.presign_post(key, content_type, max_size, expires_in)
+        except Exception as e:
+            return {"errors": str(e)}
+
+    def delete_many(self, keys):
+        """
+        Removes up to 1000 files in one go.
+        Returns {key: error} for the keys that could not be removed
+        """
+        with timed("storage"):
+            return self.backend.delete_many(keys)
+
+    def send(self, key):
+        with timed("storage"):
+            return self.backend.send(key)
+
+
+storage = Storage()
@@ -0,0 +1,307 @@
+"""
+Endpoint latency benchmark
+
+Drives every route in photo_routes, user_routes and auth_routes through
+the Flask test client against a skewed synthetic dataset (see
+`flask seed scale`) and reports, per endpoint, p50/p99 latency, the
+median number of SQL statements and the memory allocated while handling
+one request (peak above the starting point, measured with tracemalloc
+in separate runs so it doesn't skew the timings).
+
+Requests hit the heaviest rows: the user with the most photos and
+albums, the photo with the most comments. Mutations run against rows
+created for them beforehand, one per request.
+
+Without DATABASE_URL a temporary SQLite database is built and seeded;
+with it, the existing data is used (seed it with `flask seed scale`
+first) and the benchmark's own writes are left in place.
+The response cache is bypassed unless --cache is given.
+
+Usage:
+    python benchmarks/bench_endpoints.py [--users N] [--photos N] [--comments N]
+                                         [--repeat N] [--warmup N] [--allocs N]
+                                         [--cache] [--only TEXT]
+"""
+import argparse
+import io
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+WORKDIR = tempfile.mkdtemp(prefix="bench-endpoints-")
+SEED = "DATABASE_URL" not in os.environ
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR}/bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["STORAGE_ROOT"] = os.path.join(WORKDIR, "storage")
+os.environ["PERF_INSTRUMENTATION"] = "false"
+
+from sqlalchemy import event, func, insert
+
+from app import app
+from app.cache import NullBackend
+from app.models import db, User, Photo, Album, Comment, Reply, album_photos
+from app.seeds.scale import seed_scale, next_id
+from app.api.album_helpers import recount_albums
+from app.api.counter_helpers import recount_photos
+
+BLUEPRINTS = ("photos", "users", "auth")
+
+# Run on a second client, so the main one stays logged in
+SESSION_CASES = ("auth.login", "auth.logout", "auth.sign_up")
+
+
+def png(n):
+    """
+    A 1x1 PNG whose colour encodes n, so every upload is a new file
+    """
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    pixel = b"\x00" + bytes(((n >> 16) & 255, (n >> 8) & 255, n & 255))
+    return b"\x89PNG\r\n\x1a\n" \
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)) \
+        + chunk(b"IDAT", zlib.compress(pixel)) \
+        + chunk(b"IEND", b"")
+
+
+def add_rows(model, rows):
+    """
+    Inserts rows for mutations to work on; returns their ids
+    """
+    with app.app_context():
+        start = next_id(model)
+        ids = list(range(start, start + len(rows)))
+        db.session.execute(insert(model), [dict(row, id=id) for id, row in zip(ids, rows)])
+        db.session.commit()
+    return ids
+
+
+def heaviest(column):
+    return db.session.query(column).group_by(column).order_by(func.count().desc()).limit(1).scalar()
+
+
+def build_cases(client, auth_client, runs):
+    """
+    (endpoint, label, requests) for every benchmarked route, each with
+    runs requests of (method, url, kwargs, before); before, if set,
+    runs untimed ahead of its request.
+    Logs client in as the heaviest user
+    """
+    with app.app_context():
+        user_id = heaviest(Photo.author_id)
+        email = db.session.get(User, user_id).email
+        hot_photo = heaviest(Comment.photo_id)
+        hot_comment = db.session.query(Comment.id).filter(Comment.photo_id == hot_photo).limit(1).scalar()
+        own_photos = [id for id, in db.session.query(Photo.id).filter(Photo.author_id == user_id).limit(runs)]
+        own_album = db.session.query(Album.id).filter(Album.author_id == user_id).limit(1).scalar()
+        word = db.session.get(Photo, hot_photo).caption.split()[0]
+    members = ",".join(str(id) for id in own_photos[:5])
+    today = date.today()
+    stamp = time.time_ns()
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    next_cursor = client.get("/api/photos/all").get_json()["next_cursor"]
+
+    def comments():
+        ids = add_rows(Comment, [
+            {"author_id": user_id, "photo_id": hot_photo, "content": "bench", "created_at": today}
+        ] * runs)
+        with app.app_context():
+            recount_photos(Photo.id == hot_photo)
+            db.session.commit()
+        return ids
+
+    def replies():
+        ids = add_rows(Reply, [
+            {"author_id": user_id, "parent_id": hot_comment, "content": "bench", "created_at": today}
+        ] * runs)
+        with app.app_context():
+            recount_photos(Photo.id == hot_photo)
+            db.session.commit()
+        return ids
+    photos = lambda: add_rows(Photo, [
+        {"author_id": user_id, "aws_url": "https://bench.invalid/photo.png", "caption": "bench",
+         "created_at": datetime.now(), "status": "ready"}
+    ] * runs)
+
+    def albums():
+        ids = add_rows(Album, [{"author_id": user_id, "title": "bench", "created_at": today}] * runs)
+        with app.app_context():
+            db.session.execute(insert(album_photos), [{"album_id": id, "photo_id": own_photos[0]} for id in ids])
+            recount_albums(Album.id.in_(ids))
+            db.session.commit()
+        return ids
+
+    def login():
+        auth_client.post("/api/auth/login", data={"email": email, "password": "password"})
+
+    def same(method, url, **kwargs):
+        return [(method, url, kwargs, None)] * runs
+
+    return [
+        ("auth.authenticate", "", same("get", "/api/auth/")),
+        ("auth.unauthorized", "always 401", same("get", "/api/auth/unauthorized")),
+        ("auth.login", "", same("post", "/api/auth/login", data={"email": email, "password": "password"})),
+        ("auth.logout", "", [("get", "/api/auth/logout", {}, login)] * runs),
+        ("auth.sign_up", "", [
+            ("post", "/api/auth/signup", {"data": {
+                "username": f"bench{stamp}_{i}", "email": f"bench{stamp}_{i}@bench.io",
+                "password": "password", "first_name": "Bench", "last_name": "Mark"
+            }}, None) for i in range(runs)
+        ]),
+        ("photos.all_photos", "first page", same("get", "/api/photos/all")),
+        ("photos.all_photos", "second page", same("get", f"/api/photos/all?cursor={next_cursor}")),
+        ("photos.search_photos", f"q={word}", same("get", f"/api/photos/search?q={word}")),
+        ("photos.all_user_photos", "top poster", same("get", f"/api/photos/user/{user_id}")),
+        ("photos.get_photo_by_id", "hottest photo", same("get", f"/api/photos/{hot_photo}")),
+        ("photos.photo_status", "", same("get", f"/api/photos/{hot_photo}/status")),
+        ("photos.post_photo", "", [
+            ("post", "/api/photos/new", {"data": {
+                "author_id": user_id, "caption": "bench", "description": "bench",
+                "photo": (io.BytesIO(png(i)), "bench.png")
+            }}, None) for i in range(runs)
+        ]),
+        ("photos.edit_photo", "", [
+            ("put", f"/api/photos/{own_photos[i % len(own_photos)]}/edit", {"data": {
+                "author_id": user_id, "caption": f"bench {i}", "description": "bench"
+            }}, None) for i in range(runs)
+        ]),
+        ("photos.delete_photo", "", [("delete", f"/api/photos/{id}/delete", {}, None) for id in photos()]),
+        ("photos.get_all_albums", "", same("get", "/api/photos/albums/all")),
+        ("photos.create_album", "", same("post", "/api/photos/album/new", data={
+            "author_id": user_id, "photos": members, "title": "bench"
+        })),
+        ("photos.edit_album", "", same("put", f"/api/photos/albums/{own_album}/edit", data={
+            "author_id": user_id, "photos": members, "title": "bench"
+        })),
+        ("photos.delete_album", "", [("delete", f"/api/photos/albums/{id}/delete", {}, None) for id in albums()]),
+        ("photos.create_comment", "hottest photo", same("post", f"/api/photos/{hot_photo}/comments/new",
+                                                        data={"content": "bench"})),
+        ("photos.update_comment", "", [
+            ("put", f"/api/photos/comments/{id}/edit", {"data": {"content": "edited"}}, None) for id in comments()
+        ]),
+        ("photos.delete_comment", "", [
+            ("delete", f"/api/photos/{hot_photo}/comments/{id}/delete", {}, None) for id in comments()
+        ]),
+        ("photos.reply_to_comment", "", same("post", f"/api/photos/comments/{hot_comment}/new",
+                                             data={"content": "bench"})),
+        ("photos.edit_reply", "", [
+            ("put", f"/api/photos/comments/replies/{id}/edit", {"data": {"content": "edited"}}, None)
+            for id in replies()
+        ]),
+        ("photos.delete_reply", "", [
+            ("delete", f"/api/photos/comments/replies/{id}/delete", {}, None) for id in replies()
+        ]),
+        ("users.users", "", same("get", "/api/users/")),
+        ("users.user", "top poster", same("get", f"/api/users/{user_id}")),
+        ("users.user_photos", "top poster", same("get", f"/api/users/{user_id}/photos")),
+        ("users.user_albums", "top poster", same("get", f"/api/users/{user_id}/albums")),
+        ("users.edit_user", "", same("put", f"/api/users/{user_id}/edit", data={"first_name": "Bench"})),
+        ("users.set_bio", "", same("put", f"/api/users/{user_id}/bio/edit", data={"bio": "bench"})),
+    ]
+
+
+def run_case(client, engine, requests, warmup, repeat, allocs):
+    """
+    Times repeat requests after warmup ones, then measures allocations
+    over allocs more. Returns (latencies in s, queries, peak bytes,
+    error statuses)
+    """
+    latencies, queries, peaks, errors = [], [], [], []
+    count = [0]
+
+    def counter(*args):
+        count[0] += 1
+
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        for i, (method, url, kwargs, before) in enumerate(requests[:warmup + repeat + allocs]):
+            if before:
+                before()
+            tracing = i >= warmup + repeat
+            if tracing:
+                tracemalloc.start()
+            count[0] = 0
+            start = time.perf_counter()
+            response = client.open(url, method=method.upper(), **kwargs)
+            elapsed = time.perf_counter() - start
+            if tracing:
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+            if warmup <= i < warmup + repeat:
+                latencies.append(elapsed)
+                queries.append(count[0])
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+    return latencies, queries, peaks, errors
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(pct / 100 * (len(values) - 1)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--photos", type=int, default=3000)
+    parser.add_argument("--comments", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=20, help="timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--allocs", type=int, default=3, help="requests per endpoint traced for allocations")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--only", help="only endpoints whose name contains TEXT")
+    args = parser.parse_args()
+    runs = args.warmup + args.repeat + args.allocs
+
+    # Requests run outside this context: each one gets its own, as in
+    # production, so g and the session don't carry over between them
+    with app.app_context():
+        engine = db.engine
+        engine.echo = False
+        if SEED:
+            db.create_all()
+            seed_scale(args.users, args.photos, args.comments, args.comments // 4, args.photos // 4)
+    if not args.cache:
+        app.extensions["response_cache"] = NullBackend()
+
+    client = app.test_client()
+    auth_client = app.test_client()
+    auth_client.get("/api/auth/")
+    cases = build_cases(client, auth_client, runs)
+
+    print(f"{'endpoint':<26} {'case':<16} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8} {'alloc KiB':>10}")
+    for endpoint, label, requests in cases:
+        if args.only and args.only not in endpoint:
+            continue
+        case_client = auth_client if endpoint in SESSION_CASES else client
+        latencies, queries, peaks, errors = run_case(
+            case_client, engine, requests, args.warmup, args.repeat, args.allocs
+        )
+        print(f"{endpoint:<26} {label[:16]:<16} "
+              f"{percentile(latencies, 50) * 1000:9.2f} {percentile(latencies, 99) * 1000:9.2f} "
+              f"{statistics.median(queries):8.0f} "
+              f"{statistics.median(peaks) / 1024 if peaks else 0:10.0f}"
+              + (f"  errors: {sorted(set(errors))}" if errors else ""))
+
+    covered = {endpoint for endpoint, _, _ in cases}
+    missing = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                     if rule.endpoint.split(".")[0] in BLUEPRINTS and rule.endpoint not in covered)
+    if missing:
+        print(f"\nnot benchmarked: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
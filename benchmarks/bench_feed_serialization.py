@@ -0,0 +1,116 @@
+"""
+Feed serialization benchmark
+
+Builds a large synthetic feed in an in-memory SQLite database and times
+rendering it to JSON two ways:
+  orm:  PHOTO_FULL eager loading + Photo.to_dict + stdlib json provider
+  rows: app.serializers.serialize_photos + the app's JSON provider
+
+Usage:
+    python benchmarks/bench_feed_serialization.py [--photos N] [--comments N] [--replies N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert
+
+from app import app
+from app.models import db, User, Photo, Comment, Reply, Album, album_photos
+from app.models.loaders import PHOTO_FULL
+from app.api.album_helpers import recount_albums
+from app.api.counter_helpers import recount_photos
+from app.serializers import serialize_photos
+
+
+def build_feed(n_photos, n_comments, n_replies, n_users=50):
+    now = datetime.now()
+    db.session.execute(insert(User), [
+        {"id": i, "first_name": f"First{i}", "last_name": f"Last{i}",
+         "username": f"user{i}", "email": f"user{i}@bench.io",
+         "hashed_password": "x"}
+        for i in range(1, n_users + 1)
+    ])
+    db.session.execute(insert(Photo), [
+        {"id": i, "author_id": i % n_users + 1, "aws_url": f"https://bench/{i}.jpg",
+         "caption": f"Caption {i}", "description": "A sky " * 10,
+         "created_at": now - timedelta(minutes=i)}
+        for i in range(1, n_photos + 1)
+    ])
+    db.session.execute(insert(Comment), [
+        {"id": i, "author_id": i % n_users + 1, "photo_id": i % n_photos + 1,
+         "content": f"Comment {i}", "created_at": now.date()}
+        for i in range(1, n_photos * n_comments + 1)
+    ])
+    db.session.execute(insert(Reply), [
+        {"id": i, "author_id": i % n_users + 1, "parent_id": i % (n_photos * n_comments) + 1,
+         "content": f"Reply {i}", "created_at": now.date()}
+        for i in range(1, n_photos * n_comments * n_replies + 1)
+    ])
+    db.session.execute(insert(Album), [
+        {"id": i, "author_id": i, "title": f"Album {i}", "created_at": now.date()}
+        for i in range(1, n_users + 1)
+    ])
+    db.session.execute(insert(album_photos), [
+        {"album_id": i % n_users + 1, "photo_id": i}
+        for i in range(1, n_photos + 1)
+    ])
+    recount_albums()
+    recount_photos()
+    db.session.commit()
+
+
+def render_orm(photo_ids, provider):
+    photos = Photo.query.options(*PHOTO_FULL).filter(Photo.id.in_(photo_ids)).all()
+    return provider.response([photo.to_dict() for photo in photos]).get_data()
+
+
+def render_rows(photo_ids, provider):
+    return provider.response(serialize_photos(photo_ids)).get_data()
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--photos", type=int, default=500)
+    parser.add_argument("--comments", type=int, default=10, help="comments per photo")
+    parser.add_argument("--replies", type=int, default=2, help="replies per comment")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context(), app.test_request_context():
+        db.engine.echo = False
+        db.create_all()
+        build_feed(args.photos, args.comments, args.replies)
+        photo_ids = [id for id, in db.session.query(Photo.id)]
+
+        stdlib = DefaultJSONProvider(app)
+        orm = timed(lambda: render_orm(photo_ids, stdlib), args.repeat)
+        rows = timed(lambda: render_rows(photo_ids, app.json), args.repeat)
+
+    print(f"feed: {args.photos} photos, {args.photos * args.comments} comments, "
+          f"{args.photos * args.comments * args.replies} replies "
+          f"({type(app.json).__name__})")
+    print(f"  orm + to_dict + stdlib json   {orm * 1000:9.1f} ms")
+    print(f"  rows + serializers + provider {rows * 1000:9.1f} ms")
+    print(f"  speedup                       {orm / rows:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Startup benchmark
+
+Times what a web worker pays to boot, in fresh interpreters:
+importing the app package and calling create_app(), with the import
+cost broken down by `python -X importtime`. Also checks that modules
+only the flask command needs (alembic, faker) or that are loaded lazily
+(boto3, PIL) stay out of the web import.
+
+Save a baseline and compare later runs against it to catch regressions:
+    python benchmarks/bench_startup.py --save startup.json
+    python benchmarks/bench_startup.py --compare startup.json
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat N] [--top N] [--save FILE]
+                                       [--compare FILE] [--tolerance PCT]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Must not be imported when a web worker starts
+LAZY_MODULES = ("alembic", "faker", "boto3", "botocore", "PIL")
+
+BOOT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| +(\S+)$")
+
+
+def boot():
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env.setdefault("SECRET_KEY", "bench")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            # (self, cumulative) microseconds; a module is only imported once per run
+            timings[match.group(3)] = (int(match.group(1)), int(match.group(2)))
+    return json.loads(result.stdout), timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports to list")
+    parser.add_argument("--save", help="write this run's numbers to FILE as a baseline")
+    parser.add_argument("--compare", help="compare against a baseline from --save")
+    parser.add_argument("--tolerance", type=float, default=20, help="allowed slowdown, percent")
+    args = parser.parse_args()
+
+    runs = [boot() for _ in range(args.repeat)]
+    import_ms = statistics.median(run["import_ms"] for run, _ in runs)
+    create_ms = statistics.median(run["create_app_ms"] for run, _ in runs)
+    # Self time summed per top-level package, and the app's own modules
+    packages = {}
+    for name in runs[0][1]:
+        self_ms = statistics.median(timings[name][0] for _, timings in runs if name in timings) / 1000
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_ms
+    own = {
+        name: statistics.median(timings[name][1] for _, timings in runs if name in timings) / 1000
+        for name in runs[0][1] if name == "app" or name.startswith("app.")
+    }
+
+    print(f"startup: median of {args.repeat} fresh interpreters")
+    print(f"  import app    {import_ms:9.1f} ms")
+    print(f"  create_app()  {create_ms:9.1f} ms")
+    for title, group in (("heaviest packages (self)", packages), ("heaviest app modules (cumulative)", own)):
+        print(f"  {title}:")
+        for name, ms in sorted(group.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:40} {ms:9.1f} ms")
+
+    failed = False
+    loaded = set(runs[0][0]["modules"])
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    if eager:
+        print(f"  FAIL imported at startup: {', '.join(eager)}")
+        failed = True
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        limit = 1 + args.tolerance / 100
+        total = import_ms + create_ms
+        base_total = baseline["import_ms"] + baseline["create_app_ms"]
+        print(f"  vs baseline   {total:9.1f} ms  (was {base_total:.1f} ms, {total / base_total - 1:+.0%})")
+        for name, ms in sorted(own.items()):
+            was = baseline["modules"].get(name)
+            if was is not None and ms > was * limit and ms - was >= 1:
+                print(f"    slower: {name:32} {was:9.1f} -> {ms:.1f} ms")
+            elif was is None and ms >= 1:
+                print(f"    new:    {name:32} {ms:9.1f} ms")
+        if total > base_total * limit:
+            print(f"  FAIL startup regressed by more than {args.tolerance:g}%")
+            failed = True
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"import_ms": import_ms, "create_app_ms": create_ms, "modules": own}, file, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
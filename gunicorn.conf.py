@@ -0,0 +1,24 @@
+# gunicorn reads this file from the working directory on start,
+# e.g. `gunicorn app:app`
+
+import multiprocessing
+import os
+
+wsgi_app = "app:app"
+
+# Build the app once in the master and fork it into the workers, so
+# worker boots and restarts skip the imports and share their pages.
+# create_app opens no connections and starts no threads (see app/__init__.py)
+preload_app = True
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+
+def post_fork(server, worker):
+    # A worker must never reuse a pooled database connection inherited
+    # from the master; drop any without closing them under the master
+    from app import app
+    from app.models import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,41 @@
+"""add foreign key and feed indexes
+
+Revision ID: 8d3fb0fa39f5
+Revises: b4f052bf5209
+Create Date: 2026-10-18 12:05:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3fb0fa39f5'
+down_revision = 'b4f052bf5209'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Home feed keyset pagination: ORDER BY created_at DESC, id DESC
+    op.create_index('ix_photos_created_at_id', 'photos', ['created_at', 'id'], unique=False)
+    # A user's photo stream; the author_id prefix also serves plain FK lookups
+    op.create_index('ix_photos_author_id_created_at_id', 'photos', ['author_id', 'created_at', 'id'], unique=False)
+    op.create_index(op.f('ix_comments_photo_id'), 'comments', ['photo_id'], unique=False)
+    op.create_index(op.f('ix_comments_author_id'), 'comments', ['author_id'], unique=False)
+    op.create_index(op.f('ix_replies_parent_id'), 'replies', ['parent_id'], unique=False)
+    op.create_index(op.f('ix_replies_author_id'), 'replies', ['author_id'], unique=False)
+    op.create_index(op.f('ix_albums_author_id'), 'albums', ['author_id'], unique=False)
+    # The (album_id, photo_id) primary key only serves lookups by album
+    op.create_index(op.f('ix_album_photos_photo_id'), 'album_photos', ['photo_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_album_photos_photo_id'), table_name='album_photos')
+    op.drop_index(op.f('ix_albums_author_id'), table_name='albums')
+    op.drop_index(op.f('ix_replies_author_id'), table_name='replies')
+    op.drop_index(op.f('ix_replies_parent_id'), table_name='replies')
+    op.drop_index(op.f('ix_comments_author_id'), table_name='comments')
+    op.drop_index(op.f('ix_comments_photo_id'), table_name='comments')
+    op.drop_index('ix_photos_author_id_created_at_id', table_name='photos')
+    op.drop_index('ix_photos_created_at_id', table_name='photos')
@@ -0,0 +1,27 @@
+"""add photo status
+
+Revision ID: 3c1e7a92d4b6
+Revises: 8d3fb0fa39f5
+Create Date: 2026-10-18 15:30:40.201733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1e7a92d4b6'
+down_revision = '8d3fb0fa39f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing photos were uploaded synchronously, so they start out ready
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), server_default='ready', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.drop_column('status')
@@ -0,0 +1,26 @@
+"""add photo renditions
+
+Revision ID: 6f2d8b14a9e3
+Revises: 3c1e7a92d4b6
+Create Date: 2026-10-18 17:12:15.663092
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2d8b14a9e3'
+down_revision = '3c1e7a92d4b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('renditions', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.drop_column('renditions')
@@ -0,0 +1,38 @@
+"""add blobs
+
+Revision ID: a71c5e0f3b28
+Revises: 6f2d8b14a9e3
+Create Date: 2026-10-18 18:45:03.120957
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a71c5e0f3b28'
+down_revision = '6f2d8b14a9e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Files uploaded before this have random names and no row here;
+    # they keep being removed outright with their photo
+    op.create_table('blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('filename', sa.String(length=100), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(length=50), nullable=False),
+    sa.Column('renditions', sa.JSON(), nullable=True),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('filename'),
+    sa.UniqueConstraint('sha256')
+    )
+
+
+def downgrade():
+    op.drop_table('blobs')
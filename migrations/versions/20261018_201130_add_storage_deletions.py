@@ -0,0 +1,34 @@
+"""add storage deletions
+
+Revision ID: e4b9c27d6a15
+Revises: a71c5e0f3b28
+Create Date: 2026-10-18 20:11:30.548217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b9c27d6a15'
+down_revision = 'a71c5e0f3b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('storage_deletions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_storage_deletions_next_attempt_at'), 'storage_deletions', ['next_attempt_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_storage_deletions_next_attempt_at'), table_name='storage_deletions')
+    op.drop_table('storage_deletions')
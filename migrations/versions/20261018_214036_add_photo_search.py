@@ -0,0 +1,51 @@
+"""add photo search
+
+Revision ID: c5d81f3a27e9
+Revises: e4b9c27d6a15
+Create Date: 2026-10-18 21:40:36.207514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d81f3a27e9'
+down_revision = 'e4b9c27d6a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_vector', postgresql.TSVECTOR().with_variant(sa.Text(), 'sqlite'), nullable=True))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_photos_search_vector', 'photos', ['search_vector'], unique=False, postgresql_using='gin')
+        op.execute("""
+            UPDATE photos SET search_vector =
+                setweight(to_tsvector('english', coalesce(caption, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(
+                    (SELECT string_agg(content, ' ') FROM comments WHERE comments.photo_id = photos.id), ''
+                )), 'C')
+        """)
+    else:
+        op.execute("CREATE VIRTUAL TABLE photo_search USING fts5(caption, description, comments, tokenize='porter unicode61')")
+        op.execute("""
+            INSERT INTO photo_search (rowid, caption, description, comments)
+            SELECT photos.id, photos.caption, photos.description,
+                   (SELECT group_concat(comments.content, ' ') FROM comments WHERE comments.photo_id = photos.id)
+            FROM photos
+        """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_photos_search_vector', table_name='photos')
+    else:
+        op.execute("DROP TABLE IF EXISTS photo_search")
+
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.drop_column('search_vector')
@@ -0,0 +1,41 @@
+"""add album cover and count
+
+Revision ID: 7b2e4c9d1f03
+Revises: c5d81f3a27e9
+Create Date: 2026-10-18 22:44:10.583120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4c9d1f03'
+down_revision = 'c5d81f3a27e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('albums', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cover_photo_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('photo_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_foreign_key('fk_albums_cover_photo_id_photos', 'photos', ['cover_photo_id'], ['id'], ondelete='SET NULL')
+
+    # The first photo was always shown as the cover, whatever cover_photo_url held
+    op.execute("""
+        UPDATE albums SET
+            photo_count = (SELECT count(*) FROM album_photos WHERE album_photos.album_id = albums.id),
+            cover_photo_id = (SELECT min(photo_id) FROM album_photos WHERE album_photos.album_id = albums.id)
+    """)
+    op.execute("""
+        UPDATE albums SET
+            cover_photo_url = (SELECT aws_url FROM photos WHERE photos.id = albums.cover_photo_id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('albums', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_albums_cover_photo_id_photos', type_='foreignkey')
+        batch_op.drop_column('photo_count')
+        batch_op.drop_column('cover_photo_id')
@@ -0,0 +1,36 @@
+"""add photo comment counters
+
+Revision ID: 3f9a6d2e8b41
+Revises: 7b2e4c9d1f03
+Create Date: 2026-10-18 23:15:08.214507
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a6d2e8b41'
+down_revision = '7b2e4c9d1f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('reply_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("""
+        UPDATE photos SET
+            comment_count = (SELECT count(*) FROM comments WHERE comments.photo_id = photos.id),
+            reply_count = (SELECT count(*) FROM replies
+                           JOIN comments ON replies.parent_id = comments.id
+                           WHERE comments.photo_id = photos.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.drop_column('reply_count')
+        batch_op.drop_column('comment_count')
@@ -0,0 +1,31 @@
+"""add upload claims
+
+Revision ID: 5c8e1a7f2d90
+Revises: 3f9a6d2e8b41
+Create Date: 2026-10-18 23:51:14.306851
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e1a7f2d90'
+down_revision = '3f9a6d2e8b41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('upload_claims',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('upload_claims')
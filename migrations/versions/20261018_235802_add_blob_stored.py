@@ -0,0 +1,27 @@
+"""add blob stored
+
+Revision ID: 8d4f2b6a9c17
+Revises: 5c8e1a7f2d90
+Create Date: 2026-10-18 23:58:02.731846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f2b6a9c17'
+down_revision = '5c8e1a7f2d90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Every existing blob was registered after its file was stored
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stored', sa.Boolean(), server_default=sa.true(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.drop_column('stored')
@@ -0,0 +1,40 @@
+"""add response versions
+
+Revision ID: 6b2e9d4c1a83
+Revises: 8d4f2b6a9c17
+Create Date: 2026-10-18 23:59:30.418207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2e9d4c1a83'
+down_revision = '8d4f2b6a9c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    op.create_table('response_versions',
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('response_versions')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.drop_column('version')
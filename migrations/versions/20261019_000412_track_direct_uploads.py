@@ -0,0 +1,39 @@
+"""track direct uploads
+
+Revision ID: 2a7c5e9f3b16
+Revises: 6b2e9d4c1a83
+Create Date: 2026-10-19 00:04:12.559304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a7c5e9f3b16'
+down_revision = '6b2e9d4c1a83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.alter_column('sha256', existing_type=sa.String(length=64), nullable=True)
+
+    with op.batch_alter_table('upload_claims', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+    # Every existing claim was written by finalize
+    op.execute("UPDATE upload_claims SET claimed_at = created_at")
+
+
+def downgrade():
+    op.execute("DELETE FROM upload_claims WHERE claimed_at IS NULL")
+
+    with op.batch_alter_table('upload_claims', schema=None) as batch_op:
+        batch_op.drop_column('claimed_at')
+
+    op.execute("DELETE FROM blobs WHERE sha256 IS NULL")
+
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.alter_column('sha256', existing_type=sa.String(length=64), nullable=False)
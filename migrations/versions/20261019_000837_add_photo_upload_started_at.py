@@ -0,0 +1,26 @@
+"""add photo upload started at
+
+Revision ID: 9e3d7a1c5f28
+Revises: 2a7c5e9f3b16
+Create Date: 2026-10-19 00:08:37.114926
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3d7a1c5f28'
+down_revision = '2a7c5e9f3b16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('upload_started_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('photos', schema=None) as batch_op:
+        batch_op.drop_column('upload_started_at')
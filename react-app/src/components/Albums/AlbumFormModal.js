@@ -4,7 +4,7 @@ import { useSelector } from "react-redux";
 import { useDispatch } from "react-redux";
 import { useHistory } from "react-router-dom";
 import { useEffect, useState } from "react";
-import { createAlbumThunk, getAllPhotosThunk } from "../../store/photos";
+import { createAlbumThunk, getUserPhotosPageThunk } from "../../store/photos";
 import { updateAlbumThunk } from "../../store/albums";
 import NoPhotos from "../UserPage/ProfileNav/NoPhotos";
 import Loader from "../Loader";
@@ -32,7 +32,20 @@ function AlbumFormModal({album}){
     const [errors, setErrors] = useState({})
 
     const user = useSelector(state => state.session.user)
-    const allPhotos = useSelector(state => state.photos.allPhotos)
+    // The user's own photos, a page at a time from /api/users/<id>/photos
+    const [userPhotos, setUserPhotos] = useState(null)
+    const [photosCursor, setPhotosCursor] = useState(null)
+
+    async function loadUserPhotos(cursor){
+        const data = await dispatch(getUserPhotosPageThunk(user.id, cursor))
+        if (!data.photos) return;
+        setUserPhotos(loaded => [...(loaded || []), ...data.photos])
+        setPhotosCursor(data.next_cursor)
+    }
+
+    useEffect(() => {
+        loadUserPhotos()
+    }, [user.id])
 
     function handleNoPhotoClick() {
         closeModal()
@@ -113,11 +126,7 @@ function AlbumFormModal({album}){
             history.push(`/albums/${data.newAlbumId}`)
         }
     }
-    if (!allPhotos){
-        dispatch(getAllPhotosThunk())
-        return <Loader />
-    }
-    const userPhotos = Object.values(allPhotos).filter((pic) => pic.author.id === user.id)
+    if (!userPhotos) return <Loader />
     return(
         <div className="album-form-container">
             {(userPhotos.length &&
@@ -162,7 +171,7 @@ function AlbumFormModal({album}){
                                         <div className={isThisSelected(photo.id) ? "selected-photo" : "unselected-photo"} style={{height: "100px", width: "100px"}}>
                                             <i class="fas fa-check"></i>
                                         </div>
-                                        <img alt="" className="image-card-image" style={{height: "100px", width: "100px"}} src={photo.url}></img>
+                                        <img alt="" className="image-card-image" style={{height: "100px", width: "100px"}} src={photo.url} srcSet={photo.srcset} sizes="100px"></img>
                                         <input
                                         type="checkbox"
                                         name='photo'
@@ -174,6 +183,11 @@ function AlbumFormModal({album}){
                                 </div>
                                 )}
                             </div>
+                            {photosCursor &&
+                                <button type="button" onClick={() => loadUserPhotos(photosCursor)}>
+                                    Show more photos
+                                </button>
+                            }
                         </div>
                     </form>
             </div>)
@@ -56,7 +56,7 @@ function AlbumShow() {
                                 pathname: `/photos/${photo.id}`,
                                 state: { from: 'ALBUM' }
                             })}>
-                            <img alt="" src={photo.url} />
+                            <img alt="" src={photo.url} srcSet={photo.srcset} sizes="(max-width: 700px) 100vw, 33vw" />
 
                         </div>
 
@@ -34,7 +34,7 @@ function ContentCard({photo}){
                 }
 
             </div>
-            <img alt="" className="photo" src={photo.url}></img>
+            <img alt="" className="photo" src={photo.url} srcSet={photo.srcset} sizes="80vw"></img>
             <p id="photo-caption">{photo.caption}</p>
 
             <div className="description-and-comments">
@@ -43,7 +43,7 @@ function ContentCard({photo}){
             <div id="comments-button">
 
                 <i className="far fa-comment"></i>
-                    <span>{photo.comments.length}</span>
+                    <span>{photo.num_comments}</span>
                 <i className="far fa-comments"></i>
                     <span>{photo.num_replies}</span>
             </div>
@@ -2,7 +2,7 @@ import { useEffect } from "react"
 import { useDispatch, useSelector } from "react-redux"
 import ContentCard from "./FeedContentCard"
 import "./index.css"
-import { getAllPhotosThunk } from "../../store/photos"
+import { getAllPhotosThunk, getMorePhotosThunk } from "../../store/photos"
 import Loader from "../Loader"
 
 function Feed(){
@@ -12,6 +12,7 @@ function Feed(){
     */
     const dispatch = useDispatch()
     const allPhotos = useSelector(state => state.photos.allPhotos)
+    const feedCursor = useSelector(state => state.photos.feedCursor)
 
     useEffect(() => {
         dispatch(getAllPhotosThunk(allPhotos))
@@ -33,6 +34,11 @@ function Feed(){
             {sortedPhotos.map(photo => {
                 return <ContentCard key={photo.id} photo={photo}/>
             })}
+            {feedCursor &&
+                <button onClick={() => dispatch(getMorePhotosThunk(feedCursor))}>
+                    Show more photos
+                </button>
+            }
             </div>
     )
 }
@@ -131,7 +131,7 @@ function PostForm({ type }) {
                         {type ? "Click to upload a different file" : ""}
                     <input
                         type="file"
-                        accept="image/*"
+                        accept="image/png,image/jpeg,image/webp"
                         onChange={handlePhotoChange} />
                     <div className="photo-form-preview-container">
                         <span className="photo-form-preview-text" id={photoPreview ? "hide-text" : ""}>
@@ -1,7 +1,7 @@
 import { useDispatch, useSelector } from "react-redux"
 import { useHistory, useParams } from "react-router-dom"
 import { useEffect } from "react"
-import { getAllPhotosThunk } from "../../../store/photos"
+import { getAllPhotosThunk, getOnePhotoThunk } from "../../../store/photos"
 import "./index.css"
 import AuthorControls from "../../Dashboard/AuthorControls"
 import CommentSection from "../Comments"
@@ -17,6 +17,7 @@ function PhotoDetails(){
     const dispatch = useDispatch()
     const {photoId} = useParams()
     const allPhotos = useSelector((state) => state.photos.allPhotos)
+    const singlePhoto = useSelector((state) => state.photos.singlePhoto)
     const user = useSelector((state) => state.session.user)
 
     useEffect(() => {
@@ -27,8 +28,15 @@ function PhotoDetails(){
         dispatch(getAllPhotosThunk(allPhotos))
     },[dispatch])
 
+    // The feed only holds the pages loaded so far; older photos are fetched on their own
+    const inFeed = Boolean(allPhotos && allPhotos[photoId])
+    const fetched = Boolean(singlePhoto && singlePhoto.id === Number(photoId))
+    useEffect(() => {
+        if (allPhotos && !inFeed && !fetched) dispatch(getOnePhotoThunk(photoId))
+    }, [dispatch, allPhotos, inFeed, fetched, photoId])
+
     if (!allPhotos) return <Loader/>;
-    const photo = allPhotos[photoId];
+    const photo = inFeed ? allPhotos[photoId] : fetched ? singlePhoto : undefined;
     //SET PHOTO CONTEXT HERE
     setPhoto(photo)
 
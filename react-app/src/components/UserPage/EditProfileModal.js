@@ -112,14 +112,14 @@ function ProfileModal({user}){
             <label>Change Profile Picture
                 <input
                 type="file"
-                accept="image/*"
+                accept="image/png,image/jpeg,image/webp"
                 onChange={(e) => setProPic(e.target.files[0])}
                 />
             </label>
             <label>Change Cover Photo
                 <input
                 type="file"
-                accept="image/*"
+                accept="image/png,image/jpeg,image/webp"
                 onChange={(e) => setCoverPic(e.target.files[0])}
                 />
             </label>
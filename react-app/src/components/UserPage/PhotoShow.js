@@ -14,7 +14,7 @@ function PhotoShow({photo}){
             })}
         >
 
-        <img alt="" src={photo.url}></img>
+        <img alt="" src={photo.url} srcSet={photo.srcset} sizes="(max-width: 700px) 100vw, 33vw"></img>
 
         </div>
     )
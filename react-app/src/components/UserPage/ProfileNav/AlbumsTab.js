@@ -1,4 +1,4 @@
-import { useSelector } from "react-redux"
+import { useDispatch, useSelector } from "react-redux"
 import AlbumCard from "../AlbumCard";
 import AlbumFormModal from "../../Albums/AlbumFormModal";
 import OpenModalButton from "../../OpenModalButton";
@@ -6,39 +6,41 @@ import NoPhotos from "./NoPhotos";
 import NoAlbums from "./NoAlbums";
 import { useEffect } from "react";
 import Loader from "../../Loader";
+import { getProfileMoreThunk } from "../../../store/session";
 
 
 function AlbumsTab(){
     const pageOwner = useSelector(state => state.session.profilePageUser)
     const sessionUser = useSelector(state => state.session.user)
+    const dispatch = useDispatch()
 
     if (!pageOwner) return <Loader/>;
     return (
         <div style={{marginTop: "5px"}}>
             {pageOwner.id === sessionUser.id && (
-                pageOwner.photos.length > 0 &&
-                pageOwner.albums.length > 0 &&
+                pageOwner.num_photos > 0 &&
+                pageOwner.num_albums > 0 &&
                 <div id="create-album-button">
                     <OpenModalButton
                     buttonText="Create an album"
                     modalComponent={<AlbumFormModal />}/>
                 </div>)
                 || (pageOwner.id === sessionUser.id &&
-                    pageOwner.photos.length === 0 &&
+                    pageOwner.num_photos === 0 &&
                 <NoPhotos />)
             }
 
             {pageOwner.id !== sessionUser.id &&
             <div className="no-albums-container">
                 <h2>
-                    {!pageOwner.albums.length ? `It looks like ${pageOwner.first_name} hasn't put together any albums... yet.` : ''}
+                    {!pageOwner.num_albums ? `It looks like ${pageOwner.first_name} hasn't put together any albums... yet.` : ''}
                 </h2>
             </div>
             }
 
             {pageOwner.id === sessionUser.id &&
-            pageOwner.photos.length > 0 &&
-            pageOwner.albums.length === 0 &&
+            pageOwner.num_photos > 0 &&
+            pageOwner.num_albums === 0 &&
                 <NoAlbums />
             }
 
@@ -48,6 +50,11 @@ function AlbumsTab(){
                         return <AlbumCard album={album}/>
                     })}
                 </div>
+                {pageOwner.albums_next_cursor &&
+                    <button onClick={() => dispatch(getProfileMoreThunk(pageOwner.id, "albums", pageOwner.albums_next_cursor))}>
+                        Show more albums
+                    </button>
+                }
             </div>
 
 
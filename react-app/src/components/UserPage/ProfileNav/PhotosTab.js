@@ -1,13 +1,15 @@
-import { useSelector } from "react-redux"
+import { useDispatch, useSelector } from "react-redux"
 import PhotoShow from "../PhotoShow";
 import PostForm from "../../Photos/CreatePostPage";
 import OpenModalButton from "../../OpenModalButton";
 import NoPhotos from "./NoPhotos";
 import Loader from "../../Loader";
+import { getProfileMoreThunk } from "../../../store/session";
 
 function PhotosTab(){
     const pageOwner = useSelector(state => state.session.profilePageUser)
     const user = useSelector(state => state.session.user)
+    const dispatch = useDispatch()
     if (!pageOwner) return null;
     const photos = pageOwner.photos
 
@@ -31,6 +33,12 @@ function PhotosTab(){
                 </div>
             }
 
+            {pageOwner.photos_next_cursor &&
+                <button onClick={() => dispatch(getProfileMoreThunk(pageOwner.id, "photos", pageOwner.photos_next_cursor))}>
+                    Show more photos
+                </button>
+            }
+
             {pageOwner.id !== user.id &&
                 <div style={{height: "100vh"}}>
                     <h2>
@@ -36,7 +36,7 @@ function UserPageBanner(){
                     </div>
                     <div id="names-bottom">
                         <p>{pageOwner.username}</p>
-                        <span>{pageOwner.photos.length} photos • {pageOwner.albums.length} albums</span>
+                        <span>{pageOwner.num_photos} photos • {pageOwner.num_albums} albums</span>
                     </div>
                 </div>
 
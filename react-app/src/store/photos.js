@@ -1,5 +1,6 @@
 //photo constants
 const GET_ALL_PHOTOS = "photos/GET_ALL"
+const GET_MORE_PHOTOS = "photos/GET_MORE"
 const GET_USER_PHOTOS = "userPhotos/GET_ALL"
 const GET_ONE_PHOTO = "photos/GET_ONE"
 const CREATE_PHOTO = "photos/CREATE"
@@ -12,10 +13,10 @@ const UPDATE_COMMENT = "photos/comments/UPDATE"
 //reply constatns
 
 //GET ALL PHOTOS
-const getAllPhotosAction = (photos) => {
+const getAllPhotosAction = (data) => {
     return {
         type: GET_ALL_PHOTOS,
-        payload: photos
+        payload: data
     }
 }
 
@@ -32,6 +33,23 @@ export const getAllPhotosThunk = (allPhotos) => async (dispatch) => {
     }
 }
 
+//GET THE NEXT PAGE OF THE FEED
+const getMorePhotosAction = (data) => {
+    return {
+        type: GET_MORE_PHOTOS,
+        payload: data
+    }
+}
+
+export const getMorePhotosThunk = (cursor) => async (dispatch) => {
+    const response = await fetch(`/api/photos/all?cursor=${cursor}`)
+    if (response.ok){
+        const data = await response.json();
+        await dispatch(getMorePhotosAction(data));
+        return data;
+    }
+}
+
 //GET ALL OF A USER'S PHOTOS
 const getUserPhotosAction = (photos) => {
     return {
@@ -52,6 +70,13 @@ export const getUserPhotosThunk = (userId) => async (dispatch) => {
     }
 }
 
+//GET ONE PAGE OF A USER'S PHOTOS - NO ACTION/REDUCER NEEDED
+export const getUserPhotosPageThunk = (userId, cursor) => async (dispatch) => {
+    const response = await fetch(`/api/users/${userId}/photos${cursor ? `?cursor=${cursor}` : ''}`)
+    const data = await response.json()
+    return data
+}
+
 //GET ONE PHOTO
 const getOnePhotoAction = (photo) => {
     return {
@@ -267,7 +292,28 @@ export const deleteReplyThunk = (replyId) => async (dispatch) => {
     }
 }
 
-const initialState = {allPhotos: null, userPhotos: null, singlePhoto: null}
+const initialState = {allPhotos: null, feedCursor: null, userPhotos: null, singlePhoto: null}
+
+// Puts a changed photo wherever it is shown: the feed if it is on a loaded
+// page, and singlePhoto if it was fetched on its own
+function replacePhoto(state, photo) {
+    const newState = {
+        ...state,
+        allPhotos: {...state.allPhotos},
+        userPhotos: {...state.userPhotos},
+        singlePhoto: {...state.singlePhoto}
+    }
+    if (newState.allPhotos[photo.id]){
+        newState.allPhotos[photo.id] = photo
+    }
+    if (newState.userPhotos[photo.id]){
+        newState.userPhotos[photo.id] = photo
+    }
+    if (newState.singlePhoto.id === photo.id){
+        newState.singlePhoto = photo
+    }
+    return newState
+}
 
 export default function reducer(state = initialState, action) {
     switch (action.type) {
@@ -275,10 +321,24 @@ export default function reducer(state = initialState, action) {
             const newState = {
                 ...state,
                 allPhotos: {},
+                feedCursor: action.payload.next_cursor,
                 userPhotos: {...state.userPhotos},
                 singlePhoto: {...state.singlePhoto}
             }
-            action.payload.forEach(photo => {
+            action.payload.photos.forEach(photo => {
+                newState.allPhotos[photo.id] = photo
+            })
+
+            return newState
+        }
+
+        case GET_MORE_PHOTOS: {
+            const newState = {
+                ...state,
+                allPhotos: {...state.allPhotos},
+                feedCursor: action.payload.next_cursor
+            }
+            action.payload.photos.forEach(photo => {
                 newState.allPhotos[photo.id] = photo
             })
 
@@ -287,6 +347,7 @@ export default function reducer(state = initialState, action) {
 
         case GET_USER_PHOTOS: {
             const newState = {
+                ...state,
                 allPhotos: {...state.allPhotos},
                 userPhotos: null,
                 singlePhoto: {...state.singlePhoto}
@@ -319,19 +380,7 @@ export default function reducer(state = initialState, action) {
         }
 
         case UPDATE_PHOTO: {
-            const newState = {
-                ...state,
-                allPhotos: {...state.allPhotos},
-                userPhotos: {...state.userPhotos},
-                singlePhoto: {...state.singlePhoto}
-            }
-            if (newState.allPhotos[action.payload.id]){
-                newState.allPhotos[action.payload.id] = action.payload
-            }
-            if (newState.userPhotos[action.payload.id]){
-                newState.userPhotos[action.payload.id] = action.payload
-            }
-            return newState
+            return replacePhoto(state, action.payload)
         }
         case DELETE_PHOTO: {
             const newState = {
@@ -348,36 +397,15 @@ export default function reducer(state = initialState, action) {
         }
 
         case CREATE_COMMENT: {
-            const newState = {
-                allPhotos: {...state.allPhotos},
-                userPhotos: {...state.userPhotos},
-                singlePhoto: {...state.singlePhoto}
-            }
-            newState.allPhotos[action.payload.id] = action.payload
-
-            return newState
+            return replacePhoto(state, action.payload)
         }
 
         case UPDATE_COMMENT:{
-            const newState = {
-                allPhotos: {...state.allPhotos},
-                userPhotos: {...state.userPhotos},
-                singlePhoto: {...state.singlePhoto}
-            }
-            newState.allPhotos[action.payload.id] = action.payload
-
-            return newState
+            return replacePhoto(state, action.payload)
         }
 
         case DELETE_COMMENT: {
-            const newState = {
-                allPhotos: {...state.allPhotos},
-                userPhotos: {...state.userPhotos},
-                singlePhoto: {...state.singlePhoto}
-            }
-            newState.allPhotos[action.payload.id] = action.payload
-
-            return newState
+            return replacePhoto(state, action.payload)
         }
 
 
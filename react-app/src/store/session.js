@@ -3,6 +3,7 @@ const SET_USER = "session/SET_USER";
 const REMOVE_USER = "session/REMOVE_USER";
 const GET_USER_PAGE = "session/USER_PAGE";
 const EDIT_USER = "session/EDIT_USER"
+const GET_USER_PAGE_MORE = "session/USER_PAGE_MORE"
 
 const setUser = (user) => ({
 	type: SET_USER,
@@ -112,6 +113,23 @@ export const getProfileThunk = (userId) => async (dispatch) => {
 		return
 	}
 }
+// NEXT PAGE OF A USER PAGE'S PHOTOS OR ALBUMS
+// kind is "photos" or "albums"; cursor is the profile's
+// photos_next_cursor or albums_next_cursor
+const getProfileMoreAction = (userId, kind, page) => ({
+	type: GET_USER_PAGE_MORE,
+	payload: {userId, kind, page}
+})
+
+export const getProfileMoreThunk = (userId, kind, cursor) => async (dispatch) => {
+	const response = await fetch(`/api/users/${userId}/${kind}?cursor=${cursor}`)
+
+	if (response.ok) {
+		const data = await response.json();
+		dispatch(getProfileMoreAction(userId, kind, data));
+		return
+	}
+}
 //EDIT USER PAGE
 const updateProfileAction = (user) => ({
 	type: EDIT_USER,
@@ -155,6 +173,16 @@ export default function reducer(state = initialState, action) {
 			newState.profilePageUser = action.payload
 			return newState
 		}
+		case GET_USER_PAGE_MORE: {
+			const { userId, kind, page } = action.payload
+			if (!state.profilePageUser || state.profilePageUser.id !== userId) return state
+			const profilePageUser = {
+				...state.profilePageUser,
+				[kind]: [...state.profilePageUser[kind], ...page[kind]],
+				[`${kind}_next_cursor`]: page.next_cursor
+			}
+			return {...state, profilePageUser}
+		}
 		case EDIT_USER: {
 			const newState = {user: action.payload, profilePageUser: action.payload}
 			return newState
@@ -0,0 +1,54 @@
+import os
+import pytest
+
+# app.config reads these when it is imported
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("PERF_INSTRUMENTATION", "false")
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    An app on an empty SQLite database in tmp_path, with the caches
+    off and files stored locally
+    """
+    from app import create_app
+    from app.config import Config
+    from app.models import db
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        CACHE_BACKEND = "none"
+        STORAGE_BACKEND = "local"
+        STORAGE_ROOT = str(tmp_path / "storage")
+        TESTING = True
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """
+    A test client logged in as a freshly created user
+    """
+    from app.models import db, User
+
+    with app.app_context():
+        user = User(first_name="Test", last_name="User", username="test",
+                    email="test@example.com", password="password")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    return client
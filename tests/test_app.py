@@ -0,0 +1,11 @@
+import importlib
+import types
+import pytest
+
+
+@pytest.mark.parametrize("name", ["cache", "storage", "instrumentation"])
+def test_package_does_not_hide_submodules(name):
+    import app
+
+    importlib.import_module(f"app.{name}")
+    assert isinstance(getattr(app, name), types.ModuleType)
@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime
+import pytest
+from app.api.pagination_helpers import encode_cursor, decode_cursor
+from app.models import Photo
+
+
+COLUMNS = [Photo.created_at, Photo.id]
+
+
+def tampered(values):
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_round_trip():
+    created_at = datetime(2026, 10, 18, 12, 30, 5, 123456)
+    assert decode_cursor(encode_cursor([created_at, 42]), COLUMNS) == [created_at, 42]
+
+
+@pytest.mark.parametrize("values", [
+    ["2026-10-18T12:30:05", {"id": 1}],
+    ["2026-10-18T12:30:05", "42"],
+    ["2026-10-18T12:30:05", 4.2],
+    ["2026-10-18T12:30:05", True],
+    ["2026-10-18T12:30:05", None],
+    [42, 42],
+    ["not a date", 42],
+    ["2026-10-18T12:30:05"],
+    ["2026-10-18T12:30:05", 42, 42],
+    {"created_at": "2026-10-18T12:30:05", "id": 42},
+])
+def test_tampered_cursor_is_rejected(values):
+    with pytest.raises(ValueError):
+        decode_cursor(tampered(values), COLUMNS)
+
+
+def test_garbage_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor("not base64 json!", COLUMNS)
+
+
+def test_tampered_cursor_gets_400(client):
+    cursor = tampered(["2026-10-18T12:30:05", {"id": 1}])
+    for url in ("/api/photos/all", "/api/users/1/photos"):
+        response = client.get(url, query_string={"cursor": cursor})
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Invalid cursor"}